@@ -22,6 +22,9 @@ ApplicationWindow {
     }
 
     property string propagationStatus: "Processing Video..."
+    property string modelStatus: "Loading model..."
+    property bool modelReady: false
+    property bool chartReady: false
 
 
     ColumnLayout {
@@ -111,6 +114,11 @@ ApplicationWindow {
                 fillMode: Image.PreserveAspectFit
                 source: "image://frames/current"
                 cache: false
+                // Frames are rendered at the size of the view; after a resize the frame is rendered again
+                sourceSize.width: width
+                sourceSize.height: height
+                onWidthChanged: if (frameSlider.to > 1) python_bridge.request_frame(frameSlider.value)
+                onHeightChanged: if (frameSlider.to > 1) python_bridge.request_frame(frameSlider.value)
                 visible: frameSlider.to > 1
                 opacity: uploadButton.loading || propagateButton.loading ? 0.3 : 1.0
                 Behavior on opacity {
@@ -121,6 +129,7 @@ ApplicationWindow {
             }
 
             Text {
+                id: noVideoText
                 visible: frameSlider.to <= 1 && !uploadButton.loading
                 text: "No Video Loaded"
                 anchors.centerIn: parent
@@ -128,6 +137,17 @@ ApplicationWindow {
                 font.pixelSize: 24
             }
 
+            // Model loading progress (the model loads in the background after the window appears)
+            Text {
+                visible: noVideoText.visible && !window.modelReady
+                text: window.modelStatus
+                anchors.top: noVideoText.bottom
+                anchors.topMargin: 10
+                anchors.horizontalCenter: parent.horizontalCenter
+                color: "#89b4fa"
+                font.pixelSize: 14
+            }
+
             // Loading Overlay
             Item {
                 anchors.fill: parent
@@ -168,7 +188,8 @@ ApplicationWindow {
 
                     Text {
                         id: statusText
-                        text: propagateButton.loading ? window.propagationStatus : "Loading Video..."
+                        text: propagateButton.loading ? window.propagationStatus
+                              : (window.modelReady ? "Loading Video..." : "Loading Video... " + window.modelStatus)
                         Layout.alignment: Qt.AlignHCenter
                         color: "#89b4fa"
                         font.pixelSize: 14
@@ -209,6 +230,26 @@ ApplicationWindow {
                     onClicked: videoFileDialog.open()
                 }
 
+                Button {
+                    id: openAnalysisButton
+                    Layout.preferredWidth: 160
+                    Layout.preferredHeight: 45
+                    text: "Open Analysis"
+                    enabled: !uploadButton.loading && !propagateButton.loading
+                    background: Rectangle {
+                        color: openAnalysisButton.enabled ? (openAnalysisButton.down ? "#74c7ec" : "#89b4fa") : "#45475a"
+                        radius: 8
+                    }
+                    contentItem: Text {
+                        text: openAnalysisButton.text
+                        color: "white"
+                        font.bold: true
+                        horizontalAlignment: Text.AlignHCenter
+                        verticalAlignment: Text.AlignVCenter
+                    }
+                    onClicked: archiveFileDialog.open()
+                }
+
                 Button {
                     id: propagateButton
                     Layout.preferredWidth: 160
@@ -276,18 +317,100 @@ ApplicationWindow {
             radius: 12
             border.color: "#45475a"
 
-            Image {
-                id: chartImage
+            // Native chart: the bridge sends a min/max decimated series (about two points per pixel)
+            Canvas {
+                id: chartCanvas
                 anchors.fill: parent
                 anchors.margins: 10
-                fillMode: Image.PreserveAspectFit
-                source: ""
+                property var frames: []
+                property var values: []
+                property int totalFrames: 0
+                property real maxValue: 0
+
+                function clear() {
+                    frames = [];
+                    values = [];
+                    requestPaint();
+                }
+
+                onWidthChanged: {
+                    if (typeof python_bridge !== "undefined")
+                        python_bridge.set_chart_width(width);
+                    requestPaint();
+                }
+                onHeightChanged: requestPaint()
+
+                onPaint: {
+                    var ctx = getContext("2d");
+                    ctx.reset();
+                    if (frames.length === 0)
+                        return;
+
+                    var left = 80, right = 20, top = 15, bottom = 50;
+                    var w = width - left - right;
+                    var h = height - top - bottom;
+                    var xMax = Math.max(totalFrames - 1, 1);
+                    var yMax = Math.max(maxValue, 1) * 1.05;
+                    function px(x) { return left + w * x / xMax; }
+                    function py(y) { return top + h - h * y / yMax; }
+
+                    // Grid and tick labels
+                    ctx.lineWidth = 1;
+                    ctx.strokeStyle = Qt.rgba(205 / 255, 214 / 255, 244 / 255, 0.2);
+                    ctx.fillStyle = "#a6adc8";
+                    ctx.font = "12px sans-serif";
+                    for (var i = 0; i <= 4; i++) {
+                        var gy = top + h * i / 4;
+                        ctx.beginPath();
+                        ctx.moveTo(left, gy);
+                        ctx.lineTo(left + w, gy);
+                        ctx.stroke();
+                        ctx.textAlign = "right";
+                        ctx.fillText(Math.round(yMax * (4 - i) / 4), left - 8, gy + 4);
+                    }
+                    for (var j = 0; j <= 8; j++) {
+                        var frame = Math.round(xMax * j / 8);
+                        ctx.textAlign = "center";
+                        ctx.fillText(frame, px(frame), top + h + 18);
+                    }
+
+                    // Axis titles
+                    ctx.fillStyle = "#cdd6f4";
+                    ctx.font = "bold 13px sans-serif";
+                    ctx.textAlign = "center";
+                    ctx.fillText("Video Frame", left + w / 2, height - 8);
+                    ctx.save();
+                    ctx.translate(14, top + h / 2);
+                    ctx.rotate(-Math.PI / 2);
+                    ctx.fillText("Masked Pixels", 0, 0);
+                    ctx.restore();
+
+                    // Area under the curve
+                    ctx.beginPath();
+                    ctx.moveTo(px(frames[0]), py(0));
+                    for (var k = 0; k < frames.length; k++)
+                        ctx.lineTo(px(frames[k]), py(values[k]));
+                    ctx.lineTo(px(frames[frames.length - 1]), py(0));
+                    ctx.closePath();
+                    ctx.fillStyle = Qt.rgba(243 / 255, 139 / 255, 168 / 255, 0.15);
+                    ctx.fill();
+
+                    // Curve
+                    ctx.beginPath();
+                    ctx.moveTo(px(frames[0]), py(values[0]));
+                    for (var m = 1; m < frames.length; m++)
+                        ctx.lineTo(px(frames[m]), py(values[m]));
+                    ctx.lineWidth = 2;
+                    ctx.strokeStyle = "#f38ba8";
+                    ctx.stroke();
+                }
+
                 Text {
                     anchors.centerIn: parent
                     font.pixelSize: 18
-                    text: "Chart will appear after propagation"
+                    text: "Chart will appear during propagation"
                     color: "#585b70"
-                    visible: chartImage.source == ""
+                    visible: chartCanvas.frames.length === 0
                 }
             }
         }
@@ -296,7 +419,7 @@ ApplicationWindow {
         RowLayout {
             Layout.fillWidth: true
             spacing: 15
-            enabled: chartImage.source != ""
+            enabled: window.chartReady
 
             Button {
                 id: downloadCsvButton
@@ -357,6 +480,46 @@ ApplicationWindow {
                 }
                 onClicked: maskSaveDialog.open()
             }
+
+            Button {
+                id: downloadObjectDataButton
+                Layout.fillWidth: true
+                Layout.preferredHeight: 45
+                text: "Download Objects (CSV)" // Area and bbox of every tracked object
+                background: Rectangle {
+                    color: parent.enabled ? (parent.down ? "#45475a" : "#89b4fa") : "#2a2b3d"
+                    radius: 8
+                    border.color: "#45475a"
+                }
+                contentItem: Text {
+                    text: parent.text
+                    color: parent.enabled ? "white" : "#45475a"
+                    font.bold: true
+                    horizontalAlignment: Text.AlignHCenter
+                    verticalAlignment: Text.AlignVCenter
+                }
+                onClicked: objectSaveDialog.open()
+            }
+
+            Button {
+                id: downloadMaskArchiveButton
+                Layout.fillWidth: true
+                Layout.preferredHeight: 45
+                text: "Download Mask Archive" // Reopen later with "Open Analysis"
+                background: Rectangle {
+                    color: parent.enabled ? (parent.down ? "#45475a" : "#89b4fa") : "#2a2b3d"
+                    radius: 8
+                    border.color: "#45475a"
+                }
+                contentItem: Text {
+                    text: parent.text
+                    color: parent.enabled ? "white" : "#45475a"
+                    font.bold: true
+                    horizontalAlignment: Text.AlignHCenter
+                    verticalAlignment: Text.AlignVCenter
+                }
+                onClicked: archiveSaveDialog.open()
+            }
         }
     }
 
@@ -367,12 +530,26 @@ ApplicationWindow {
         nameFilters: ["Video files (*.mp4 *.avi *.mov *.mkv)"]
         onAccepted: {
             uploadButton.loading = true;
-            chartImage.source = "";
+            chartCanvas.clear();
+            window.chartReady = false;
             if (typeof python_bridge !== "undefined")
                 python_bridge.load_video(selectedFile);
         }
     }
 
+    FileDialog {
+        id: archiveFileDialog
+        title: "Open Mask Archive"
+        nameFilters: ["Mask archive (*.sqm)"]
+        onAccepted: {
+            uploadButton.loading = true;
+            chartCanvas.clear();
+            window.chartReady = false;
+            if (typeof python_bridge !== "undefined")
+                python_bridge.open_mask_archive(selectedFile);
+        }
+    }
+
     FileDialog {
         id: csvSaveDialog
         title: "Save Graph Data as CSV"
@@ -409,6 +586,30 @@ ApplicationWindow {
         }
     }
 
+    FileDialog {
+        id: objectSaveDialog
+        title: "Save Object Data as CSV"
+        fileMode: FileDialog.SaveFile
+        nameFilters: ["CSV File (*.csv)"]
+        currentFile: "squirrel_objects.csv"
+        onAccepted: {
+            if (typeof python_bridge !== "undefined")
+                python_bridge.download_object_csv(selectedFile);
+        }
+    }
+
+    FileDialog {
+        id: archiveSaveDialog
+        title: "Save Mask Archive"
+        fileMode: FileDialog.SaveFile
+        nameFilters: ["Mask archive (*.sqm)"]
+        currentFile: "squirrel_masks.sqm"
+        onAccepted: {
+            if (typeof python_bridge !== "undefined")
+                python_bridge.download_mask_archive(selectedFile);
+        }
+    }
+
     // Connections to handle signals from the Python backend
     Connections {
         target: python_bridge
@@ -427,11 +628,27 @@ ApplicationWindow {
         }
         function onPropagationFinished() {
             propagateButton.loading = false;
+            window.chartReady = true;
             window.propagationStatus = "Processing Video...";
             python_bridge.request_frame(frameSlider.value);
         }
-        function onChartImageUpdated(imgData) {
-            chartImage.source = imgData;
+        function onChartDataUpdated(frames, values, totalFrames, maxValue) {
+            chartCanvas.frames = frames;
+            chartCanvas.values = values;
+            chartCanvas.totalFrames = totalFrames;
+            chartCanvas.maxValue = maxValue;
+            chartCanvas.requestPaint();
+        }
+        function onModelStatusChanged(status) {
+            window.modelStatus = status;
+        }
+        function onModelReady() {
+            window.modelReady = true;
+        }
+        function onVideo_load_failed(message) {
+            uploadButton.loading = false;
+            errorDialog.text = message;
+            errorDialog.open();
         }
     }
 }
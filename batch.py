@@ -0,0 +1,308 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from functools import partial
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+from logic.sam3_authenticator import SAM3Auth
+from logic.sam3_segmenter import Sam3VideoSegmenter
+from logic.inference_backend import PRECISIONS
+from logic.sinks import VideoSink, AreaCsvSink, BBoxCsvSink, ObjectCsvSink, MaskArchiveSink
+from logic.video_export import CODECS, QUALITIES
+from logic.profiler import PROFILE_ENV
+from logic.stub_model import STUB_MODEL_ID
+from logic.worker_pool import SegmenterPool, segment_video_parallel
+
+# Headless batch entry point: segments every video of a directory or glob with one loaded model.
+# Does not import PySide6, so it runs on servers without a display.
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+DONE_MARKER = "done.json"
+
+
+# Function to expand the inputs (files, directories or glob patterns) into a sorted list of videos
+def collect_videos(inputs, recursive=False):
+    videos = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, "**", "*") if recursive else os.path.join(item, "*")
+            candidates = glob.glob(pattern, recursive=recursive)
+        else:
+            candidates = glob.glob(item, recursive=recursive)
+        videos.update(
+            os.path.abspath(path) for path in candidates
+            if os.path.isfile(path) and path.lower().endswith(VIDEO_EXTENSIONS)
+        )
+    return sorted(videos)
+
+
+# Function to get the output directory of one video; the parent folder name avoids clashes of equal file names
+def output_dir_for(video_path, output_root):
+    parent = os.path.basename(os.path.dirname(video_path))
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    return os.path.join(output_root, f"{parent}_{stem}" if parent else stem)
+
+
+# Function to segment one video and write all exports; returns the timing summary
+# prompt is one text prompt or a list of prompts, all tracked in the same propagation pass,
+# keyframes are the set_keyframes options (e.g. {"step": 4}) or None to run the model on every frame,
+# motion_gate the set_motion_gate options or None to send static frames to the model as well,
+# video_options the overlay video settings (codec, quality, max_side; max_side None for original size),
+# mask_archive whether the masks are kept in masks.sqm for reopening the results without the model,
+# use_cache whether the decoded frames go to the persistent frame cache (only worth it for clips that
+# are processed again; by default they are spilled to temporary files that are deleted afterwards)
+def process_video(segmenter, video_path, out_dir, prompt, export_video=True, keyframes=None, motion_gate=None,
+                  video_options=None, mask_archive=True, use_cache=False):
+    os.makedirs(out_dir, exist_ok=True)
+    timings = {"video": video_path}
+    segmenter.profiler.reset()
+
+    start = time.perf_counter()
+    segmenter.load_video(video_path, use_cache=use_cache)
+    segmenter.add_text_prompt(prompt)
+    if motion_gate is not None:
+        segmenter.set_motion_gate(**motion_gate)
+    if keyframes:
+        segmenter.set_keyframes(**keyframes)
+    timings["load_s"] = time.perf_counter() - start
+
+    # All exports are streamed while propagating, processed frames are not kept in memory
+    sinks = [
+        AreaCsvSink(os.path.join(out_dir, "areas.csv")),
+        BBoxCsvSink(os.path.join(out_dir, "bboxes.csv")),
+        ObjectCsvSink(os.path.join(out_dir, "objects.csv"), prompts=segmenter.prompts),
+    ]
+    if mask_archive:
+        sinks.append(MaskArchiveSink(os.path.join(out_dir, "masks.sqm"), metadata=segmenter.archive_metadata()))
+    if export_video:
+        # Overlays are rendered from the original frames on the writer thread, at the source frame rate
+        video_options = dict(video_options or {})
+        render = partial(segmenter.render_export_frame, max_side=video_options.pop("max_side", None))
+        sinks.append(VideoSink(
+            os.path.join(out_dir, "overlay.mp4"), fps=segmenter.video_fps, render=render,
+            profiler=segmenter.profiler, **video_options,
+        ))
+
+    start = time.perf_counter()
+    segmenter.propagate_video(sinks=sinks, keep_frames=False)
+    timings["propagate_s"] = time.perf_counter() - start
+    segmenter.export_results(os.path.join(out_dir, "results.npz"))
+
+    num_frames = len(segmenter.results)
+    timings["frames"] = num_frames
+    timings["detected_frames"] = int(segmenter.results.detected.sum())
+    timings["objects"] = len(np.unique(segmenter.object_results["object_id"]))
+    timings["model_frames"] = num_frames - int((segmenter.results.interpolated | segmenter.results.gated).sum())
+    if segmenter.motion_gate is not None:
+        timings["motion_gate"] = segmenter.motion_gate.stats()
+    timings["fps"] = num_frames / timings["propagate_s"] if timings["propagate_s"] > 0 else 0.0
+    timings["total_s"] = timings["load_s"] + timings["propagate_s"]
+    if segmenter.profiler.enabled:
+        segmenter.profiler.write_json(os.path.join(out_dir, "profile.json"))
+        segmenter.profiler.write_csv(os.path.join(out_dir, "profile.csv"))
+
+    # The marker is written last, so interrupted runs are redone on resume
+    with open(os.path.join(out_dir, DONE_MARKER), "w") as f:
+        json.dump({**timings, "prompt": prompt}, f, indent=2)
+    return timings
+
+
+# Function to segment one long video as overlapping temporal windows on the worker pool.
+# Only the CSV and npz exports are written; the overlay video needs the masks of one continuous run.
+def process_video_windows(pool, video_path, out_dir, prompt, target_size, num_windows, overlap, use_cache=False):
+    os.makedirs(out_dir, exist_ok=True)
+    timings = {"video": video_path, "load_s": 0.0}
+
+    start = time.perf_counter()
+    results = segment_video_parallel(pool, video_path, prompt, target_size, num_segments=num_windows, overlap=overlap,
+                                     use_cache=use_cache)
+    timings["propagate_s"] = time.perf_counter() - start
+    results.write_area_csv(os.path.join(out_dir, "areas.csv"))
+    results.write_bbox_csv(os.path.join(out_dir, "bboxes.csv"))
+    results.save(os.path.join(out_dir, "results.npz"))
+
+    timings["frames"] = len(results)
+    timings["detected_frames"] = int(results.detected.sum())
+    timings["fps"] = len(results) / timings["propagate_s"] if timings["propagate_s"] > 0 else 0.0
+    timings["total_s"] = timings["propagate_s"]
+
+    with open(os.path.join(out_dir, DONE_MARKER), "w") as f:
+        json.dump({**timings, "prompt": prompt, "windows": num_windows, "overlap": overlap}, f, indent=2)
+    return timings
+
+
+# Generator running process_video for every (video, out_dir) pair; yields the timings or the exception.
+# The model is loaded once, or once per worker process when --workers is above 1.
+def run_jobs(todo, args):
+    keyframes = None
+    if args.keyframe_step or args.diff_threshold is not None:
+        keyframes = {"step": args.keyframe_step, "diff_threshold": args.diff_threshold, "fill": args.fill}
+    segmenter_options = {
+        "model_id": args.model_id,
+        "target_size": args.target_size,
+        "precision": args.precision,
+        "compile_model": args.compile,
+    }
+    motion_gate = None
+    if args.motion_gate:
+        motion_gate = {"pixel_threshold": args.gate_pixel_threshold, "min_fraction": args.gate_min_fraction}
+    video_options = {
+        "codec": args.codec,
+        "quality": args.quality,
+        "max_side": None if args.export_original_size else args.export_max_side,
+    }
+
+    if args.windows > 1:
+        pool = SegmenterPool(args.workers, threads_per_worker=args.threads_per_worker, **segmenter_options)
+        try:
+            for video, out_dir in todo:
+                try:
+                    yield process_video_windows(
+                        pool, video, out_dir, args.prompt, args.target_size, args.windows, args.overlap,
+                        use_cache=args.frame_cache,
+                    )
+                except Exception as e:
+                    yield e
+        finally:
+            pool.close()
+        return
+
+    if args.workers > 1:
+        pool = SegmenterPool(args.workers, threads_per_worker=args.threads_per_worker, **segmenter_options)
+        try:
+            tasks = [
+                (video, out_dir, args.prompt, not args.no_video, keyframes, motion_gate, video_options,
+                 not args.no_mask_archive, args.frame_cache)
+                for video, out_dir in todo
+            ]
+            yield from pool.map(process_video, tasks, return_exceptions=True)
+        finally:
+            pool.close()
+        return
+
+    segmenter = Sam3VideoSegmenter(num_threads=args.threads_per_worker, **segmenter_options)
+    for video, out_dir in todo:
+        try:
+            yield process_video(
+                segmenter, video, out_dir, args.prompt, export_video=not args.no_video,
+                keyframes=keyframes, motion_gate=motion_gate, video_options=video_options,
+                mask_archive=not args.no_mask_archive, use_cache=args.frame_cache,
+            )
+        except Exception as e:
+            yield e
+        finally:
+            segmenter.release_video()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Segment squirrels in a batch of videos without the GUI.")
+    parser.add_argument("inputs", nargs="+", help="Video files, directories or glob patterns")
+    parser.add_argument("-o", "--output-dir", default="batch_output", help="Directory for the per-video results")
+    parser.add_argument("-p", "--prompt", nargs="+", default=["Squirrel"],
+                        help="Text prompts for SAM3, all tracked in one pass (e.g. -p Squirrel Bird)")
+    parser.add_argument("--model-id", default="facebook/sam3",
+                        help=f"Hugging Face model id, '{STUB_MODEL_ID}' for the offline stub model")
+    parser.add_argument("--target-size", type=int, default=1024, help="Longer frame side used for inference")
+    parser.add_argument("--precision", choices=PRECISIONS, default="auto", help="Model precision (int8: CPU only)")
+    parser.add_argument("--compile", action="store_true", help="Compile the model with torch.compile")
+    parser.add_argument("--recursive", action="store_true", help="Search directories recursively")
+    parser.add_argument("--no-video", action="store_true", help="Skip the overlay video export")
+    parser.add_argument("--no-mask-archive", action="store_true", help="Do not keep the masks in masks.sqm")
+    parser.add_argument("--codec", choices=tuple(CODECS), default="h264", help="Codec of the overlay video")
+    parser.add_argument("--quality", choices=QUALITIES, default="medium", help="Quality of the overlay video")
+    parser.add_argument("--export-max-side", type=int, default=1280,
+                        help="Longer side of the overlay video (source aspect ratio, never upscaled)")
+    parser.add_argument("--export-original-size", action="store_true", help="Export the overlay video at original size")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write per-stage timings (profile.json, profile.csv) for every video")
+    parser.add_argument("--overwrite", action="store_true", help="Reprocess videos that already have results")
+    parser.add_argument("--frame-cache", action="store_true",
+                        help="Keep the decoded frames in the persistent frame cache (for clips processed again)")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes, each with its own model replica")
+    parser.add_argument("--threads-per-worker", type=int, default=None, help="Torch threads (per worker process)")
+    parser.add_argument("--keyframe-step", type=int, default=None, help="Run the model only on every k-th frame")
+    parser.add_argument("--diff-threshold", type=float, default=None,
+                        help="Also run the model on frames where more than this share of pixels changed (0-1)")
+    parser.add_argument("--fill", choices=("interpolate", "carry"), default="interpolate",
+                        help="How skipped frames are filled in keyframe mode")
+    parser.add_argument("--motion-gate", action="store_true", help="Skip the model on static frames")
+    parser.add_argument("--gate-pixel-threshold", type=float, default=20, help="Gray value change of a moving pixel")
+    parser.add_argument("--gate-min-fraction", type=float, default=0.001,
+                        help="Share of moving pixels above which a frame goes to the model")
+    parser.add_argument("--windows", type=int, default=1, help="Split every video into this many temporal windows")
+    parser.add_argument("--overlap", type=int, default=16, help="Frames shared by neighbouring windows")
+    args = parser.parse_args(argv)
+
+    # Windows are propagated by propagate_range on the pool, which runs every frame through the model and
+    # only returns the per-frame results; options it cannot honour are rejected instead of being ignored
+    if args.windows > 1:
+        unsupported = [
+            option for option, name in (
+                ("--keyframe-step", "keyframe_step"), ("--diff-threshold", "diff_threshold"),
+                ("--motion-gate", "motion_gate"), ("--codec", "codec"), ("--quality", "quality"),
+                ("--export-max-side", "export_max_side"), ("--export-original-size", "export_original_size"),
+            )
+            if getattr(args, name) != parser.get_default(name)
+        ]
+        if unsupported:
+            parser.error(f"{', '.join(unsupported)} cannot be combined with --windows")
+        print("--windows: only areas.csv, bboxes.csv and results.npz are written (no overlay video, "
+              "objects.csv or masks.sqm).")
+
+    # Via the environment the setting also reaches the worker processes
+    if args.profile:
+        os.environ[PROFILE_ENV] = "1"
+
+    videos = collect_videos(args.inputs, recursive=args.recursive)
+    if not videos:
+        print("No videos found.")
+        return 1
+
+    # Resume: skip videos whose results are complete
+    todo = []
+    for video in videos:
+        out_dir = output_dir_for(video, args.output_dir)
+        if not args.overwrite and os.path.exists(os.path.join(out_dir, DONE_MARKER)):
+            print(f"Skipping {video} (already processed)")
+            continue
+        todo.append((video, out_dir))
+    print(f"{len(videos)} videos found, {len(todo)} to process.")
+    if not todo:
+        return 0
+
+    # The offline stub needs no Hugging Face access
+    if args.model_id != STUB_MODEL_ID and not SAM3Auth().login():
+        print("Login failed.")
+        return 1
+
+    summary = []
+    failed = 0
+    batch_start = time.perf_counter()
+    for i, ((video, _), timings) in enumerate(zip(todo, run_jobs(todo, args)), 1):
+        print(f"\n[{i}/{len(todo)}] {video}")
+        if isinstance(timings, Exception):
+            failed += 1
+            print(f"Failed to process {video}: {timings}")
+            continue
+        summary.append(timings)
+        print(
+            f"  {timings['frames']} frames, load {timings['load_s']:.1f}s, "
+            f"propagate {timings['propagate_s']:.1f}s ({timings['fps']:.1f} fps)"
+        )
+
+    total = time.perf_counter() - batch_start
+    os.makedirs(args.output_dir, exist_ok=True)
+    with open(os.path.join(args.output_dir, "summary.json"), "w") as f:
+        json.dump({"total_s": total, "failed": failed, "videos": summary}, f, indent=2)
+
+    frames = sum(t["frames"] for t in summary)
+    print(f"\nProcessed {len(summary)} videos ({frames} frames) in {total:.1f}s, {failed} failed.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from logic.synthetic_video import write_synthetic_video
+from logic.sinks import FrameSink
+
+# Benchmark of the inference backends (precision, torch.compile) with the real SAM3 model:
+# every mode runs in its own process, so the peak RSS of one mode does not hide the next one.
+# Prints per-frame latency (first frame separately, it includes compilation) and peak RSS.
+
+MODES = {
+    "float32": {"precision": "float32"},
+    "bfloat16": {"precision": "bfloat16"},
+    "int8": {"precision": "int8"},
+    "float32+compile": {"precision": "float32", "compile_model": True},
+}
+
+
+# Sink that only records when each frame result arrives
+class TimingSink(FrameSink):
+    needs_frames = False
+
+    def __init__(self):
+        self.times = []
+
+    def write(self, result):
+        self.times.append(time.perf_counter())
+
+
+# Function to run one mode in this process and return its measurements
+def run_mode(mode, video_path, prompt, target_size, num_threads, device):
+    from logic.sam3_segmenter import Sam3VideoSegmenter
+
+    start = time.perf_counter()
+    segmenter = Sam3VideoSegmenter(target_size=target_size, device=device, num_threads=num_threads, **MODES[mode])
+    load_s = time.perf_counter() - start
+    segmenter.load_video(video_path, use_cache=False)
+    segmenter.add_text_prompt(prompt)
+
+    sink = TimingSink()
+    start = time.perf_counter()
+    segmenter.propagate_video(sinks=[sink], keep_frames=False)
+    latencies = np.diff([start] + sink.times) * 1000
+    return {
+        "mode": mode,
+        "model_load_s": load_s,
+        "first_frame_ms": float(latencies[0]),
+        "mean_ms": float(latencies[1:].mean()) if len(latencies) > 1 else float(latencies[0]),
+        "p95_ms": float(np.percentile(latencies[1:], 95)) if len(latencies) > 1 else float(latencies[0]),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "detected_frames": int(segmenter.results.detected.sum()),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark SAM3 inference backends")
+    parser.add_argument("video", nargs="?", help="Short clip to run (default: synthetic 2s clip)")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--prompt", default="Squirrel")
+    parser.add_argument("--target-size", type=int, default=512)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--device", default=None)
+    parser.add_argument("--run-mode", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child process: run a single mode and print the result as JSON on the last line
+    if args.run_mode:
+        result = run_mode(args.run_mode, args.video, args.prompt, args.target_size, args.threads, args.device)
+        print(json.dumps(result))
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video_path = args.video
+        if video_path is None:
+            video_path = os.path.join(tmp, "synthetic.mp4")
+            write_synthetic_video(video_path, 60, 1280, 720)
+
+        rows = []
+        for mode in args.modes:
+            command = [sys.executable, __file__, video_path, "--run-mode", mode, "--prompt", args.prompt,
+                       "--target-size", str(args.target_size)]
+            if args.threads:
+                command += ["--threads", str(args.threads)]
+            if args.device:
+                command += ["--device", args.device]
+            print(f"Running {mode} ...")
+            process = subprocess.run(command, capture_output=True, text=True)
+            if process.returncode != 0:
+                print(f"{mode} failed:\n{process.stderr.strip().splitlines()[-1] if process.stderr else ''}")
+                continue
+            rows.append(json.loads(process.stdout.strip().splitlines()[-1]))
+
+    print(f"\n{'mode':>16} {'load s':>7} {'1st ms':>8} {'mean ms':>8} {'p95 ms':>8} {'peak RSS MB':>12} {'detected':>9}")
+    for row in rows:
+        print(
+            f"{row['mode']:>16} {row['model_load_s']:>7.1f} {row['first_frame_ms']:>8.0f} {row['mean_ms']:>8.0f} "
+            f"{row['p95_ms']:>8.0f} {row['peak_rss_mb']:>12.0f} {row['detected_frames']:>9}"
+        )
@@ -0,0 +1,109 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import cv2 as cv
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from logic.frame_buffer import FrameBuffer
+from logic.sam3_segmenter import Sam3VideoSegmenter
+from logic.stub_model import create_stub
+from logic.synthetic_video import write_synthetic_video
+
+# Micro-benchmark of the frame hand-off from the segmenter to the GUI on a synthetic 4K clip.
+# Old path: copy of the frame, overlay, BGR->RGB conversion, QImage.rgbSwapped() and QImage.copy()
+# in the provider - four full resolution copies per frame.
+# New path: the production path of the GUI - PrefetchScheduler acquires a display buffer,
+# showSingleFrame renders into it and FrameProvider.update_frame publishes and wraps it.
+# Masks come from the stub model (logic/stub_model.py) and are cached before timing, so only the
+# hand-off is measured. Without PySide6 the QImage copies are emulated with numpy.
+
+try:
+    from PySide6.QtGui import QImage
+except ImportError:
+    QImage = None
+
+
+# Function to run the old hand-off: returns the image handed to QML and the number of full-size copies
+def old_path(segmenter, frame_idx):
+    mask = segmenter.segment_frame(frame_idx)
+    frame = segmenter.video_frames_original_size[frame_idx].copy()
+    h, w = frame.shape[:2]
+    if mask is not None:
+        mask_resized = cv.resize(mask.astype(np.uint8), (w, h), interpolation=cv.INTER_NEAREST)
+        frame[mask_resized > 0] = [0, 255, 0]
+    frame_rgb = cv.cvtColor(frame, cv.COLOR_BGR2RGB)
+    if QImage is not None:
+        image = QImage(frame_rgb.data, w, h, 3 * w, QImage.Format_RGB888).rgbSwapped().copy()
+    else:
+        image = np.ascontiguousarray(frame_rgb[:, :, ::-1]).copy()
+    return image, 4
+
+
+# Function to run the new hand-off into a FrameBuffer: returns the image handed to QML and the
+# number of full-size copies (rendering at source size copies the frame, publishing a frame that is
+# not one of the buffers copies it again)
+def new_path(segmenter, frame_idx, frame_buffer):
+    src_h, src_w = segmenter.video_frames_original_size.shape[1:3]
+    out = frame_buffer.acquire(*frame_buffer.fit(src_h, src_w))
+    rendered = segmenter.showSingleFrame(frame_idx, return_frame_only=True, out=out)
+    frame = frame_buffer.publish(rendered)
+    copies = int(rendered.shape[:2] == (src_h, src_w)) + int(frame is not rendered)
+    h, w = frame.shape[:2]
+    if QImage is not None:
+        return QImage(frame.data, w, h, 3 * w, QImage.Format_RGB888), copies
+    return frame, copies
+
+
+# Function to time a hand-off function over the frames of the clip and return the median in milliseconds
+def time_ms(fn, num_frames, repeats):
+    times = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        fn(i % num_frames)
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the frame hand-off to the GUI")
+    parser.add_argument("--width", type=int, default=3840)
+    parser.add_argument("--height", type=int, default=2160)
+    parser.add_argument("--frames", type=int, default=8, help="Length of the synthetic clip")
+    parser.add_argument("--display", default="1280x720", help="Size of the video view (WxH)")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+    display_w, display_h = (int(v) for v in args.display.lower().split("x"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video_path = os.path.join(tmp, "synthetic.mp4")
+        write_synthetic_video(video_path, args.frames, args.width, args.height)
+        model, processor = create_stub()
+        segmenter = Sam3VideoSegmenter(target_size=512, model=model, processor=processor)
+        segmenter.load_video(video_path, use_cache=False)
+        segmenter.add_text_prompt("Squirrel")
+        num_frames = len(segmenter.video_frames)
+        for i in range(num_frames):
+            segmenter.segment_frame(i)
+
+        full_buffer = FrameBuffer()
+        display_buffer = FrameBuffer()
+        display_buffer.display_size = (display_w, display_h)
+
+        rows = [
+            ("old", old_path(segmenter, 0)[1],
+             time_ms(lambda i: old_path(segmenter, i), num_frames, args.repeats)),
+            ("new, full size", new_path(segmenter, 0, full_buffer)[1],
+             time_ms(lambda i: new_path(segmenter, i, full_buffer), num_frames, args.repeats)),
+            (f"new, {display_w}x{display_h}", new_path(segmenter, 0, display_buffer)[1],
+             time_ms(lambda i: new_path(segmenter, i, display_buffer), num_frames, args.repeats)),
+        ]
+        segmenter.release_video()
+
+    print(f"Frame {args.width}x{args.height}, QImage: {'PySide6' if QImage is not None else 'emulated'}")
+    print(f"{'path':>18} {'full-size copies':>17} {'ms/frame':>9}")
+    for name, copies, ms in rows:
+        print(f"{name:>18} {copies:>17} {ms:>9.1f}")
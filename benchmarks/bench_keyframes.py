@@ -0,0 +1,70 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from logic.keyframes import compare_results
+from logic.sam3_segmenter import Sam3VideoSegmenter
+from logic.stub_model import create_stub
+from logic.synthetic_video import write_synthetic_video
+
+# Accuracy vs. speed of the keyframe mode: runs the full propagation once as reference and then
+# every keyframe setting on the same clip, and reports fps, speedup and the error against the full run.
+# With a video path the real SAM3 model is used, so k can be picked per camera site; without one a
+# synthetic clip and the stub model (logic/stub_model.py), which segments the squirrel of the clip
+# from the frame content, are used.
+
+
+# Function to propagate the loaded video and return the results and the elapsed time
+def timed_run(segmenter):
+    start = time.perf_counter()
+    segmenter.propagate_video(keep_frames=False)
+    return segmenter.results, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark keyframe mode against a full propagation")
+    parser.add_argument("video", nargs="?", help="Video to test with the real model (default: synthetic clip)")
+    parser.add_argument("--prompt", default="Squirrel")
+    parser.add_argument("--steps", type=int, nargs="+", default=[2, 4, 8, 16])
+    parser.add_argument("--diff-thresholds", type=float, nargs="*", default=[0.002, 0.01])
+    parser.add_argument("--fill", choices=("interpolate", "carry"), default="interpolate")
+    parser.add_argument("--frames", type=int, default=240, help="Length of the synthetic clip")
+    parser.add_argument("--model-ms", type=float, default=20.0, help="Model step of the stub model")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.video:
+            video_path = args.video
+            segmenter = Sam3VideoSegmenter()
+        else:
+            video_path = os.path.join(tmp, "synthetic.mp4")
+            write_synthetic_video(video_path, args.frames, 1280, 720)
+            model, processor = create_stub(model_ms=args.model_ms)
+            segmenter = Sam3VideoSegmenter(target_size=512, model=model, processor=processor)
+        segmenter.load_video(video_path, use_cache=bool(args.video))
+        segmenter.add_text_prompt(args.prompt)
+
+        reference, full_time = timed_run(segmenter)
+
+        settings = [(f"every {k}", {"step": k}) for k in args.steps]
+        settings += [(f"diff > {t:g}", {"step": max(args.steps), "diff_threshold": t}) for t in args.diff_thresholds]
+        rows = []
+        for name, options in settings:
+            segmenter.set_frame_range(0, len(segmenter.video_frames))
+            segmenter.set_keyframes(fill=args.fill, **options)
+            keyframes = len(segmenter.session_frame_indices)
+            results, seconds = timed_run(segmenter)
+            rows.append((name, keyframes, seconds, compare_results(reference, results)))
+        segmenter.release_video()
+
+    frames = len(reference)
+    print(f"\nFull run: {frames} frames in {full_time:.2f}s ({frames / full_time:.1f} fps), fill: {args.fill}")
+    print(f"{'setting':>12} {'model':>6} {'fps':>7} {'speedup':>8} {'area err':>9} {'det agree':>10} {'bbox IoU':>9}")
+    for name, keyframes, seconds, error in rows:
+        print(
+            f"{name:>12} {keyframes:>6} {frames / seconds:>7.1f} {full_time / seconds:>7.2f}x "
+            f"{error['area_rel_error']:>8.1%} {error['detection_agreement']:>9.1%} {error['bbox_iou']:>9.3f}"
+        )
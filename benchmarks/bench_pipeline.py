@@ -0,0 +1,47 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from logic.sam3_segmenter import Sam3VideoSegmenter
+from logic.stub_model import create_stub
+from logic.synthetic_video import write_synthetic_video
+
+# Benchmark for the pipelined propagate_video: compares the serial loop (num_workers=0) with the
+# worker pool on a synthetic clip. The stub model (logic/stub_model.py) sleeps for the duration of a
+# model step and its post-processing upsamples the masks and sleeps for postprocess_ms, so the overlap
+# between both becomes visible.
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark serial vs. pipelined propagate_video")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--model-ms", type=float, default=20.0)
+    parser.add_argument("--postprocess-ms", type=float, default=15.0)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video_path = os.path.join(tmp, "synthetic.mp4")
+        write_synthetic_video(video_path, args.frames, 1280, 720)
+
+        model, processor = create_stub(model_ms=args.model_ms, postprocess_ms=args.postprocess_ms)
+        segmenter = Sam3VideoSegmenter(target_size=512, model=model, processor=processor)
+        segmenter.load_video(video_path, use_cache=False)
+        segmenter.add_text_prompt("Squirrel")
+        model_only = 1000 / args.model_ms
+
+        timings = {}
+        for name, workers in (("serial", 0), ("pipelined", args.workers)):
+            start = time.perf_counter()
+            segmenter.propagate_video(num_workers=workers)
+            timings[name] = time.perf_counter() - start
+
+        segmenter.release_video()
+
+    print(f"\nModel-only rate: {model_only:.1f} fps")
+    for name, seconds in timings.items():
+        print(f"{name:>10}: {seconds:.2f}s ({args.frames / seconds:.1f} fps)")
+    print(f"Speedup: {timings['serial'] / timings['pipelined']:.2f}x")
@@ -0,0 +1,68 @@
+import argparse
+import functools
+import os
+import sys
+import tempfile
+import time
+import types
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from logic.sam3_segmenter import Sam3VideoSegmenter
+from logic.stub_model import create_stub
+from logic.synthetic_video import write_synthetic_video
+from logic.worker_pool import SegmenterPool, propagate_range, segment_video_parallel
+
+# Scaling benchmark for the multi-process worker pool: runs the same set of clips (one job per
+# video) and one long clip (temporal segments) with 1..N workers and reports frames/sec.
+# The stub model (logic/stub_model.py) burns CPU with cpu_matmuls matrix multiplications instead of
+# sleeping, so the numbers depend on the cores of the machine like real CPU inference does.
+
+
+# Factory run inside every worker process
+def make_stub_segmenter(matmuls, target_size):
+    model, processor = create_stub(cpu_matmuls=matmuls)
+    return Sam3VideoSegmenter(target_size=target_size, model=model, processor=processor)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the segmenter worker pool with 1..N workers")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--videos", type=int, default=8)
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--matmuls", type=int, default=40, help="CPU work per model step")
+    parser.add_argument("--threads-per-worker", type=int, default=None)
+    args = parser.parse_args()
+
+    factory = functools.partial(make_stub_segmenter, args.matmuls, 512)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Clips are decoded into a scratch frame cache once, so the runs only measure inference
+        os.environ["SQUIRREL_CACHE_DIR"] = os.path.join(tmp, "cache")
+        videos = []
+        for i in range(args.videos):
+            videos.append(os.path.join(tmp, f"clip_{i}.mp4"))
+            write_synthetic_video(videos[-1], args.frames, 640, 360)
+        long_video = os.path.join(tmp, "long.mp4")
+        write_synthetic_video(long_video, args.frames * args.videos, 640, 360)
+
+        rows = []
+        for workers in range(1, args.max_workers + 1):
+            with SegmenterPool(workers, factory=factory, threads_per_worker=args.threads_per_worker) as pool:
+                start = time.perf_counter()
+                results = list(pool.map(propagate_range, [(video, "Squirrel") for video in videos]))
+                per_video = time.perf_counter() - start
+                frames = sum(len(columns["frame_idx"]) for columns, _ in results)
+
+                start = time.perf_counter()
+                merged = segment_video_parallel(pool, long_video, "Squirrel", 512)
+                segmented = time.perf_counter() - start
+            rows.append(types.SimpleNamespace(
+                workers=workers, threads=pool.threads_per_worker,
+                video_fps=frames / per_video, segment_fps=len(merged) / segmented,
+            ))
+
+    print(f"\n{'workers':>8} {'threads':>8} {'videos fps':>11} {'segments fps':>13} {'speedup':>8}")
+    for row in rows:
+        print(
+            f"{row.workers:>8} {row.threads:>8} {row.video_fps:>11.1f} {row.segment_fps:>13.1f} "
+            f"{row.video_fps / rows[0].video_fps:>7.2f}x"
+        )
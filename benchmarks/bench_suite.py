@@ -0,0 +1,217 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from logic.synthetic_video import RESOLUTIONS, write_synthetic_video
+from logic.keyframes import compare_results
+
+# Offline regression suite: runs the hot paths of Sam3VideoSegmenter with the stub model
+# (logic/stub_model.py) on synthetic clips and compares throughput and memory with a stored baseline.
+# Every clip runs in its own process, so peak RSS is measured per clip. Exits with 1 if a metric
+# is worse than the baseline by more than the tolerance.
+#   python benchmarks/bench_suite.py                     # compare with benchmarks/baseline.json
+#   python benchmarks/bench_suite.py --update-baseline   # store the current numbers as baseline
+# The baseline depends on the machine; regenerate it on the machine that runs the comparison.
+
+DEFAULT_CLIPS = ["360p:150", "720p:150"]
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+# Function to time fn; returns (result, seconds)
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+# Function to run all measurements for one clip in this process; metrics end in _fps or _agreement
+# (higher is better), _ms or _mb (lower is better)
+def run_clip(video_path, num_frames, target_size, single_frames):
+    from logic.sam3_segmenter import Sam3VideoSegmenter
+    from logic.sinks import VideoSink, AreaCsvSink, BBoxCsvSink, MaskArchiveSink
+
+    metrics = {}
+    with tempfile.TemporaryDirectory() as out:
+        segmenter = Sam3VideoSegmenter(model_id="stub", target_size=target_size)
+
+        _, seconds = timed(segmenter.load_video, video_path, use_cache=False)
+        metrics["load_video_fps"] = num_frames / seconds
+        segmenter.add_text_prompt("Squirrel")
+
+        # Single frames as in the GUI: first request runs the model, later ones hit the mask cache.
+        # Frame 0 warms up the model and the renderer; medians keep single slow calls out of the gate.
+        segmenter.showSingleFrame(0, return_frame_only=True)
+        frame_ids = np.unique(np.linspace(1, num_frames - 1, single_frames).astype(int))
+        times = [timed(segmenter.showSingleFrame, int(i), return_frame_only=True)[1] for i in frame_ids]
+        metrics["single_frame_ms"] = float(np.median(times)) * 1000
+        times = [timed(segmenter.showSingleFrame, int(i), return_frame_only=True)[1] for _ in range(3) for i in frame_ids]
+        metrics["single_frame_cached_ms"] = float(np.median(times)) * 1000
+
+        frames, seconds = timed(segmenter.propagate_video, keep_frames=True)
+        metrics["propagate_fps"] = num_frames / seconds
+
+        sinks = [
+            VideoSink(os.path.join(out, "stream.mp4"), fps=segmenter.video_fps, codec="mpeg4",
+                      render=segmenter.render_export_frame),
+            AreaCsvSink(os.path.join(out, "areas.csv")),
+            BBoxCsvSink(os.path.join(out, "bboxes.csv")),
+            MaskArchiveSink(os.path.join(out, "masks.sqm"), metadata=segmenter.archive_metadata()),
+        ]
+        _, seconds = timed(segmenter.propagate_video, sinks=sinks, keep_frames=False)
+        metrics["propagate_streaming_fps"] = num_frames / seconds
+
+        # The first call imports matplotlib
+        segmenter.generate_graph_image(segmenter.mask_areas)
+        _, seconds = timed(segmenter.generate_graph_image, segmenter.mask_areas)
+        metrics["graph_image_ms"] = seconds * 1000
+        _, seconds = timed(segmenter.export_graph_csv, os.path.join(out, "graph.csv"))
+        metrics["export_area_csv_ms"] = seconds * 1000
+        _, seconds = timed(segmenter.export_mask_csv, os.path.join(out, "mask.csv"))
+        metrics["export_bbox_csv_ms"] = seconds * 1000
+        _, seconds = timed(segmenter.export_results, os.path.join(out, "results.npz"))
+        metrics["export_results_ms"] = seconds * 1000
+        _, seconds = timed(segmenter.export_video, frames, os.path.join(out, "video.mp4"), codec="mpeg4")
+        metrics["export_video_fps"] = num_frames / seconds
+
+        metrics["detected_frames"] = int(segmenter.results.detected.sum())
+
+        # The motion gate must not lose detections of the full run
+        full_results = segmenter.results
+        segmenter.set_motion_gate()
+        _, seconds = timed(segmenter.propagate_video, keep_frames=False)
+        metrics["motion_gate_fps"] = num_frames / seconds
+        metrics["motion_gate_agreement"] = compare_results(full_results, segmenter.results)["detection_agreement"]
+
+        # Ranges shorter than the dilation kernel of the gate (2 * pad + 1 frames) must work as well
+        short = min(num_frames, segmenter.motion_gate.pad)
+        segmenter.set_frame_range(0, short)
+        segmenter.set_motion_gate()
+        segmenter.propagate_video(keep_frames=False)
+        if len(segmenter.results) != short:
+            raise RuntimeError(f"Motion gate on {short} frames returned {len(segmenter.results)} results.")
+        segmenter.set_frame_range(0, num_frames)
+
+        # Reopening the analysed clip from its mask archive, without the model
+        _, seconds = timed(segmenter.load_mask_archive, os.path.join(out, "masks.sqm"))
+        metrics["load_mask_archive_ms"] = seconds * 1000
+        _, seconds = timed(segmenter.export_overlay_video, os.path.join(out, "archive.mp4"), codec="mpeg4")
+        metrics["export_archive_video_fps"] = num_frames / seconds
+        segmenter.release_video()
+
+    metrics["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return metrics
+
+
+# Function to get the regressions of current against baseline as a list of messages
+# (differences below min_delta_ms are ignored for the short timings, _agreement may drop by quality_tolerance)
+def compare(current, baseline, tolerance, memory_tolerance, min_delta_ms=2.0, quality_tolerance=0.02):
+    regressions = []
+    for clip, metrics in current.items():
+        for name, value in metrics.items():
+            reference = baseline.get(clip, {}).get(name)
+            if reference is None or not reference:
+                continue
+            if name == "detected_frames":
+                if value != reference:
+                    regressions.append(f"{clip} {name}: {value} (baseline {reference})")
+            elif name.endswith("_agreement"):
+                if value < reference - quality_tolerance:
+                    regressions.append(f"{clip} {name}: {value:.3f} (baseline {reference:.3f})")
+            elif name.endswith("_fps"):
+                if value < reference * (1 - tolerance):
+                    regressions.append(f"{clip} {name}: {value:.1f} (baseline {reference:.1f}, {value / reference - 1:+.0%})")
+            else:
+                limit = memory_tolerance if name.endswith("_mb") else tolerance
+                if name.endswith("_ms") and value - reference < min_delta_ms:
+                    continue
+                if value > reference * (1 + limit):
+                    regressions.append(f"{clip} {name}: {value:.1f} (baseline {reference:.1f}, {value / reference - 1:+.0%})")
+    return regressions
+
+
+# Function to describe the machine the numbers belong to
+def machine_info():
+    return {"platform": platform.platform(), "processor": platform.processor(), "cpus": os.cpu_count()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark suite with regression check")
+    parser.add_argument("--clips", nargs="+", default=DEFAULT_CLIPS,
+                        help=f"Synthetic clips as resolution:frames, resolutions: {', '.join(RESOLUTIONS)}")
+    parser.add_argument("--target-size", type=int, default=512)
+    parser.add_argument("--single-frames", type=int, default=30, help="Frames requested with showSingleFrame")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="Store the results as new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed slowdown (0.3 = 30%%)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.2, help="Allowed growth of peak RSS")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="Ignore smaller slowdowns of _ms metrics")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--run-clip", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child process: measure one clip and print the metrics as JSON on the last line
+    if args.run_clip:
+        video_path, num_frames = args.run_clip.rsplit(":", 1)
+        print(json.dumps(run_clip(video_path, int(num_frames), args.target_size, args.single_frames)))
+        sys.exit(0)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for clip in args.clips:
+            resolution, num_frames = clip.split(":")
+            width, height = RESOLUTIONS[resolution]
+            video_path = os.path.join(tmp, f"{resolution}_{num_frames}.mp4")
+            write_synthetic_video(video_path, int(num_frames), width, height)
+
+            print(f"Running {clip} ...")
+            env = {**os.environ, "SQUIRREL_CACHE_DIR": os.path.join(tmp, "cache")}
+            command = [sys.executable, __file__, "--run-clip", f"{video_path}:{num_frames}",
+                       "--target-size", str(args.target_size), "--single-frames", str(args.single_frames)]
+            process = subprocess.run(command, capture_output=True, text=True, env=env)
+            if process.returncode != 0:
+                print(f"{clip} failed:\n{process.stderr.strip()}")
+                sys.exit(1)
+            results[clip] = json.loads(process.stdout.strip().splitlines()[-1])
+
+    names = list(next(iter(results.values())))
+    print(f"\n{'metric':>26} " + " ".join(f"{clip:>12}" for clip in results))
+    for name in names:
+        print(f"{name:>26} " + " ".join(f"{results[clip][name]:>12.3g}" if name.endswith("_agreement")
+                                         else f"{results[clip][name]:>12.1f}" for clip in results))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"machine": machine_info(), "clips": results}, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"machine": machine_info(), "target_size": args.target_size, "clips": results}, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        sys.exit(0)
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}, run with --update-baseline first.")
+        sys.exit(0)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("machine") != machine_info():
+        print(f"\nWarning: the baseline was recorded on another machine ({baseline.get('machine')}).")
+    if baseline.get("target_size") != args.target_size:
+        print(f"\nWarning: the baseline was recorded with target size {baseline.get('target_size')}.")
+
+    regressions = compare(results, baseline["clips"], args.tolerance, args.memory_tolerance, args.min_delta_ms)
+    if regressions:
+        print(f"\nPERFORMANCE REGRESSION ({len(regressions)} metrics worse than baseline):")
+        for message in regressions:
+            print(f"  {message}")
+        sys.exit(1)
+    print("\nNo regressions against the baseline.")
@@ -0,0 +1,86 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2 as cv
+import numpy as np
+
+# Function to compute the (width, height) a frame is resized to so its longer side equals target_size
+def target_shape(h, w, target_size):
+    scale = target_size / max(h, w)
+    return int(w * scale), int(h * scale)
+
+# Class to resize whole chunks of equally sized frames at once.
+# The target shape is computed once per clip and the output buffer is allocated once and reused
+# for every chunk. The opencv backend splits a chunk across a thread pool (cv.resize releases the GIL),
+# the torch backend resizes the whole chunk with one interpolate call.
+class BatchResizer:
+    def __init__(self, target_size, backend="opencv", num_threads=None, device="cpu"):
+        if backend not in ("opencv", "torch"):
+            raise ValueError(f"Unknown resize backend: {backend}")
+        self.target_size = target_size
+        self.backend = backend
+        self.device = device
+        self.num_threads = num_threads or min(8, os.cpu_count() or 1)
+        self.pool = ThreadPoolExecutor(self.num_threads) if backend == "opencv" and self.num_threads > 1 else None
+        self.size = None
+        self.output = None
+        self.frames_done = 0
+        self.seconds = 0.0
+
+    # Function to resize a chunk of shape (n, H, W, 3); returns a view into the reused output buffer
+    def resize(self, chunk):
+        start = time.perf_counter()
+        n, h, w = chunk.shape[:3]
+        if self.size is None:
+            self.size = target_shape(h, w, self.target_size)
+        new_w, new_h = self.size
+
+        if self.output is None or len(self.output) < n:
+            self.output = np.empty((n, new_h, new_w, chunk.shape[3]), dtype=np.uint8)
+        out = self.output[:n]
+
+        if self.backend == "torch":
+            self._resize_torch(chunk, out)
+        elif self.pool is None:
+            self._resize_range(chunk, out, 0, n)
+        else:
+            step = -(-n // self.num_threads)
+            jobs = [
+                self.pool.submit(self._resize_range, chunk, out, i, min(i + step, n))
+                for i in range(0, n, step)
+            ]
+            for job in jobs:
+                job.result()
+
+        self.frames_done += n
+        self.seconds += time.perf_counter() - start
+        return out
+
+    def _resize_range(self, chunk, out, begin, end):
+        for i in range(begin, end):
+            cv.resize(chunk[i], self.size, dst=out[i], interpolation=cv.INTER_AREA)
+
+    def _resize_torch(self, chunk, out):
+        import torch
+        import torch.nn.functional as F
+
+        new_w, new_h = self.size
+        batch = torch.from_numpy(np.ascontiguousarray(chunk)).to(self.device)
+        batch = batch.permute(0, 3, 1, 2).float()
+        # "area" is the torch counterpart of cv.INTER_AREA
+        resized = F.interpolate(batch, size=(new_h, new_w), mode="area")
+        resized = resized.round_().clamp_(0, 255).to(torch.uint8).permute(0, 2, 3, 1)
+        np.copyto(out, resized.cpu().numpy())
+
+    @property
+    def fps(self):
+        return self.frames_done / self.seconds if self.seconds > 0 else 0.0
+
+    # Function to get a short throughput summary
+    def report(self):
+        return f"Resized {self.frames_done} frames in {self.seconds:.2f}s ({self.fps:.1f} fps, {self.backend})"
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
@@ -1,54 +1,114 @@
+import atexit
+import json
+import os
 import sys
+import shutil
+import tempfile
 import threading
+import time
+from functools import partial
 from PySide6.QtCore import QObject, Slot, Signal, QTimer, QMetaObject, Qt, QUrl
 from PySide6.QtGui import QDesktopServices
 
 # Absolute Imports für die Paketstruktur
+# (sam3_segmenter zieht torch nach sich und wird erst im Lade-Thread importiert)
 from logic.sam3_authenticator import SAM3Auth
-from logic.sam3_segmenter import Sam3VideoSegmenter
+from logic.prefetch import PrefetchScheduler
+from logic.chart import minmax_decimate
 
 # Bridge class to connect QML and Segmenter logic
 class Bridge(QObject):
     maxFrameChanged = Signal(int)
     frameUpdated = Signal() 
     propagationFinished = Signal()
-    chartImageUpdated = Signal(str)
+    # Dezimierte Flächenkurve für den QML-Canvas: Frame-Indizes, Werte, Anzahl Frames, Maximum
+    chartDataUpdated = Signal(list, list, int, int)
     statusUpdated = Signal(str) 
     operationFinished = Signal(str) 
     video_load_failed = Signal(str)
+    modelStatusChanged = Signal(str)
+    modelReady = Signal()
+    # Intern: fertig segmentierter Frame vom Inferenz-Thread an den GUI-Thread
+    _frameReady = Signal(int, object)
 
-    def __init__(self, provider, app_instance, splash=None):
+    def __init__(self, provider, app_instance):
         super().__init__()
         self.provider = provider
         self.app = app_instance
-        
-        # Fortschritt auf dem Splash Screen aktualisieren
-        if splash: splash.set_progress(20)
-        self.app.processEvents() 
-
-        # Authentifizierung für Modell-Zugriff
-        auth = SAM3Auth()
-        if not auth.login():
-            print("Login failed. Closing App...")
-            sys.exit(-1)
-            
-        if splash: splash.set_progress(50)
-        self.app.processEvents()
-        
-        # Initialisierung des Segmenters (Blackwell-optimiert via Torch 2.10)
-        self.segmenter = Sam3VideoSegmenter(target_size=1024)
-        
-        if splash: splash.set_progress(80)
-        self.app.processEvents()
+
+        # Segmenter und Modell werden im Hintergrund geladen (start_model_loading), damit das Fenster sofort erscheint
+        self.segmenter = None
+        self.segmenter_ready = threading.Event()
         
         # Timer für die Frame-Verarbeitung (flüssiges UI)
         self.frame_timer = QTimer(self)
         self.frame_timer.setSingleShot(True)
         self.frame_timer.timeout.connect(self._process_frame)
         self.pending_frame_idx = None
-        self.last_processed_frames = [] 
+
+        # Inferenz und Prefetching laufen im Hintergrund, der GUI-Thread blockiert nie am Modell
+        self._frameReady.connect(self._show_frame)
+        self.scheduler = PrefetchScheduler(None, self._frameReady.emit, frame_buffer=self.provider.frame_buffer)
+
+        # Exporte werden während der Propagation in dieses Verzeichnis gestreamt
+        self.export_dir = None
         self.propagationFinished.connect(self.generate_graph)
 
+        # Breite des Chart-Canvas in Pixeln, bestimmt die Dezimierung der Kurve
+        self.chart_width = 1200
+
+        # Einstellungen für den Video-Export (Codec, Qualität, Originalgröße statt max. 1280 px)
+        self.export_codec = os.getenv("SQUIRREL_EXPORT_CODEC", "h264")
+        self.export_quality = os.getenv("SQUIRREL_EXPORT_QUALITY", "medium")
+        self.export_max_side = None if os.getenv("SQUIRREL_EXPORT_ORIGINAL_SIZE") == "1" else 1280
+
+        # Text-Prompts, kommagetrennt (z. B. "Squirrel,Bird"); alle werden in einem Durchlauf verfolgt
+        self.prompts = [p.strip() for p in os.getenv("SQUIRREL_PROMPTS", "Squirrel").split(",") if p.strip()] or ["Squirrel"]
+
+    def start_model_loading(self):
+        threading.Thread(target=self._load_model, daemon=True).start()
+
+    def _load_model(self):
+        try:
+            # Authentifizierung für Modell-Zugriff (offline gecacht, siehe SAM3Auth);
+            # mit SQUIRREL_MODEL_ID=stub läuft die App ohne Gewichte mit dem Stub-Modell
+            model_id = os.getenv("SQUIRREL_MODEL_ID", "facebook/sam3")
+            self.modelStatusChanged.emit("Checking Hugging Face login...")
+            if model_id != "stub" and not SAM3Auth().login():
+                self.modelStatusChanged.emit("Hugging Face login failed. Check HF_TOKEN in .env and restart.")
+                return
+
+            self.modelStatusChanged.emit("Loading PyTorch...")
+            from logic.sam3_segmenter import Sam3VideoSegmenter
+
+            # Initialisierung des Segmenters (Blackwell-optimiert via Torch 2.10)
+            # Präzision und CPU-Threads lassen sich per Umgebungsvariable wählen (z.B. int8 auf der CPU)
+            # Das Modell lädt asynchron weiter; load_video dekodiert schon und wartet im Segmenter darauf
+            self.segmenter = Sam3VideoSegmenter(
+                model_id=model_id,
+                target_size=1024,
+                precision=os.getenv("SQUIRREL_PRECISION", "auto"),
+                num_threads=int(os.getenv("SQUIRREL_THREADS", "0")) or None,
+                load_async=True,
+                progress_callback=self._on_model_progress,
+            )
+            self.scheduler.segmenter = self.segmenter
+        except Exception as e:
+            self.modelStatusChanged.emit(f"Loading the model failed: {e}")
+            return
+        finally:
+            self.segmenter_ready.set()
+
+        try:
+            self.segmenter.wait_until_ready()
+        except RuntimeError:
+            # Fehlermeldung kam bereits über den Fortschritt
+            return
+        self.modelReady.emit()
+
+    def _on_model_progress(self, percent, text):
+        self.modelStatusChanged.emit(text if percent >= 100 else f"{text} ({percent}%)")
+
     def _parse_path(self, url):
         """Konvertiert QML File-URLs in lokale Systempfade."""
         path = url.replace("file:///", "")
@@ -64,12 +124,45 @@ class Bridge(QObject):
         threading.Thread(target=self._run_segmentation, args=(path,), daemon=True).start()
 
     def _run_segmentation(self, path):
-        self.segmenter.load_video(path)
-        self.segmenter.add_text_prompt("Squirrel")
+        self._reset_export_dir()
+        self.segmenter_ready.wait()
+        if self.segmenter is None:
+            self.video_load_failed.emit("The model could not be loaded.")
+            return
+        try:
+            with self.scheduler.model_lock:
+                self.scheduler.reset()
+                self.segmenter.load_video(path)
+                self.segmenter.add_text_prompt(self.prompts)
+        except Exception as e:
+            self.video_load_failed.emit(str(e))
+            return
         self.maxFrameChanged.emit(len(self.segmenter.video_frames) - 1)
         self.pending_frame_idx = 0
         QMetaObject.invokeMethod(self, "_process_frame", Qt.QueuedConnection)
 
+    # Öffnet eine gespeicherte Analyse (Masken-Archiv): Ergebnisse, Kurve und Overlays ohne Inferenz
+    @Slot(str)
+    def open_mask_archive(self, archive_url):
+        path = self._parse_path(archive_url)
+        threading.Thread(target=self._run_open_archive, args=(path,), daemon=True).start()
+
+    def _run_open_archive(self, path):
+        self._reset_export_dir()
+        self.segmenter_ready.wait()
+        if self.segmenter is None:
+            self.video_load_failed.emit("The model could not be loaded.")
+            return
+        try:
+            with self.scheduler.model_lock:
+                self.scheduler.reset()
+                self.segmenter.load_mask_archive(path)
+        except Exception as e:
+            self.video_load_failed.emit(str(e))
+            return
+        self.maxFrameChanged.emit(len(self.segmenter.video_frames) - 1)
+        self.propagationFinished.emit()
+
     @Slot(int)
     def request_frame(self, frame_idx):
         self.pending_frame_idx = frame_idx
@@ -77,48 +170,152 @@ class Bridge(QObject):
 
     @Slot()
     def _process_frame(self):
-        if self.pending_frame_idx is None: return
-        frame = self.segmenter.showSingleFrame(self.pending_frame_idx, return_frame_only=True)
+        if self.pending_frame_idx is None or self.segmenter is None: return
+        self.scheduler.request(self.pending_frame_idx)
+        self.pending_frame_idx = None
+
+    @Slot(int, object)
+    def _show_frame(self, frame_idx, frame):
         if frame is not None:
             self.provider.update_frame(frame)
             self.frameUpdated.emit()
-        self.pending_frame_idx = None
 
     @Slot()
     def propagate_video(self):
         def worker():
-            self.last_processed_frames = self.segmenter.propagate_video(status_callback=self.statusUpdated.emit)
+            from logic.sinks import VideoSink, AreaCsvSink, BBoxCsvSink, ObjectCsvSink, MaskArchiveSink
+
+            # Video und CSVs entstehen direkt während der Propagation, Frames bleiben nicht im Speicher.
+            # Das Video wird im Writer-Thread aus den Originalframes gerendert und kodiert (Quell-FPS).
+            # Eine aus dem Masken-Archiv geöffnete Analyse hat keine Modell-Session, das Video wird neu geladen
+            if self.segmenter.inference_session is None:
+                with self.scheduler.model_lock:
+                    self.scheduler.reset()
+                    self.segmenter.load_video(self.segmenter.video_path)
+                    self.segmenter.add_text_prompt(self.prompts)
+
+            self._reset_export_dir()
+            self.export_dir = tempfile.mkdtemp(prefix="squirrel_export_")
+            atexit.register(shutil.rmtree, self.export_dir, True)
+            video_sink = VideoSink(
+                os.path.join(self.export_dir, "overlay.mp4"),
+                fps=self.segmenter.video_fps,
+                codec=self.export_codec,
+                quality=self.export_quality,
+                render=partial(self.segmenter.render_export_frame, max_side=self.export_max_side),
+                profiler=self.segmenter.profiler,
+            )
+            sinks = [
+                video_sink,
+                AreaCsvSink(os.path.join(self.export_dir, "areas.csv")),
+                BBoxCsvSink(os.path.join(self.export_dir, "bboxes.csv")),
+                ObjectCsvSink(os.path.join(self.export_dir, "objects.csv"), prompts=self.segmenter.prompts),
+                # Masken-Archiv zum späteren Öffnen der Analyse ohne Modell
+                MaskArchiveSink(os.path.join(self.export_dir, "masks.sqm"), metadata=self.segmenter.archive_metadata()),
+            ]
+            # Die Kurve wird während der Propagation etwa zweimal pro Sekunde aktualisiert
+            last_chart_update = [0.0]
+            def on_status(text):
+                writer = video_sink.writer
+                self.statusUpdated.emit(f"{text} | Export: {writer.frames_written} frames ({writer.throughput:.1f} fps)")
+                now = time.monotonic()
+                if now - last_chart_update[0] > 0.5:
+                    last_chart_update[0] = now
+                    self.generate_graph()
+
+            with self.scheduler.model_lock:
+                self.segmenter.propagate_video(status_callback=on_status, sinks=sinks, keep_frames=False)
+            writer = video_sink.writer
+            self.statusUpdated.emit(
+                f"Video export finished: {writer.frames_written} frames ({writer.throughput:.1f} fps)"
+            )
             self.propagationFinished.emit()
         threading.Thread(target=worker, daemon=True).start()
 
+    def _reset_export_dir(self):
+        if self.export_dir:
+            shutil.rmtree(self.export_dir, ignore_errors=True)
+        self.export_dir = None
+
+    def _copy_export(self, name, file_url):
+        """Kopiert eine gestreamte Exportdatei an den vom Nutzer gewählten Pfad."""
+        source = os.path.join(self.export_dir, name) if self.export_dir else None
+        if not source or not os.path.exists(source):
+            return False
+        shutil.copyfile(source, self._parse_path(file_url))
+        return True
+
     @Slot()
     def generate_graph(self):
-        if not self.segmenter.mask_areas: return
-        # Maskendaten für die Chart-Visualisierung aufbereiten
-        url = self.segmenter.generate_graph_image([int(x) for x in self.segmenter.mask_areas])
-        if url: self.chartImageUpdated.emit(url)
+        areas = self.segmenter.mask_areas
+        if len(areas) == 0: return
+        # Maskendaten per Min/Max-Dezimierung auf die Canvas-Breite reduzieren, gezeichnet wird in QML
+        indices, values = minmax_decimate(areas, self.chart_width)
+        frames = self.segmenter.results["frame_idx"][indices]
+        self.chartDataUpdated.emit(
+            frames.tolist(), values.tolist(), len(self.segmenter.video_frames), int(values.max())
+        )
+
+    # Aktuelle Stufen-Zeiten als JSON (mit SQUIRREL_PROFILE=1), kann aus QML periodisch abgefragt werden
+    @Slot(result=str)
+    def profile_snapshot(self):
+        if self.segmenter is None:
+            return "{}"
+        return json.dumps(self.segmenter.profiler.snapshot())
+
+    @Slot(int)
+    def set_chart_width(self, width):
+        self.chart_width = max(int(width), 1)
 
     @Slot(str)
     def download_csv(self, file_url):
-        if self.segmenter.export_graph_csv(self._parse_path(file_url)):
+        if self._copy_export("areas.csv", file_url) or self.segmenter.export_graph_csv(self._parse_path(file_url)):
             self.operationFinished.emit("CSV Data Exported Successfully!")
 
     @Slot(str)
     def download_video(self, file_url):
-        try:
-            self.segmenter.export_video(self.last_processed_frames, self._parse_path(file_url))
-            self.operationFinished.emit("Video Exported Successfully!")
-        except Exception:
-            self.operationFinished.emit("Video Export Failed.")
+        # Das Video kann mehrere GB groß sein, kopiert wird deshalb nicht im GUI-Thread
+        def worker():
+            try:
+                self.statusUpdated.emit("Saving video...")
+                # Nach dem Öffnen eines Masken-Archivs wird das Video aus den Masken neu gerendert
+                if self._copy_export("overlay.mp4", file_url) or self.segmenter.export_overlay_video(
+                    self._parse_path(file_url), codec=self.export_codec, quality=self.export_quality,
+                    max_side=self.export_max_side,
+                ):
+                    self.operationFinished.emit("Video Exported Successfully!")
+                else:
+                    self.operationFinished.emit("Video Export Failed.")
+            except Exception:
+                self.operationFinished.emit("Video Export Failed.")
+        threading.Thread(target=worker, daemon=True).start()
     
     @Slot(str)
     def download_training_csv(self, file_url):
         path = self._parse_path(file_url)
-        if self.segmenter.export_mask_csv(path):
+        if self._copy_export("bboxes.csv", file_url) or self.segmenter.export_mask_csv(path):
             self.operationFinished.emit("Training CSV Exported Successfully!")
         else:
             self.operationFinished.emit("Training Export Failed: No mask data found.")
     
+    @Slot(str)
+    def download_object_csv(self, file_url):
+        path = self._parse_path(file_url)
+        if self._copy_export("objects.csv", file_url) or self.segmenter.export_object_csv(path):
+            self.operationFinished.emit("Object CSV Exported Successfully!")
+        else:
+            self.operationFinished.emit("Object Export Failed: No mask data found.")
+
+    @Slot(str)
+    def download_mask_archive(self, file_url):
+        if self._copy_export("masks.sqm", file_url):
+            self.operationFinished.emit("Mask Archive Exported Successfully!")
+        elif self.segmenter.mask_archive is not None:
+            shutil.copyfile(self.segmenter.mask_archive.path, self._parse_path(file_url))
+            self.operationFinished.emit("Mask Archive Exported Successfully!")
+        else:
+            self.operationFinished.emit("Mask Archive Export Failed: Please run 'Propagate Video' first.")
+
     @Slot()
     def open_help_link(self):
         QDesktopServices.openUrl(QUrl("https://github.com/janbecker2/Squirrel-App/blob/main/README.md"))
\ No newline at end of file
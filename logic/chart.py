@@ -0,0 +1,26 @@
+import math
+import numpy as np
+
+# Helpers for drawing the mask-area curve at display resolution
+
+
+# Function to reduce a series to at most 2 * width points by min/max decimation: the values are split
+# into width buckets and the minimum and maximum of every bucket are kept (in frame order), so peaks
+# and gaps stay visible at any zoom level. Returns (indices, values); short series are returned as is.
+def minmax_decimate(values, width):
+    values = np.asarray(values)
+    n = len(values)
+    width = max(int(width), 1)
+    if n <= 2 * width:
+        return np.arange(n), values
+
+    bucket = math.ceil(n / width)
+    buckets = math.ceil(n / bucket)
+    padded = np.pad(values, (0, buckets * bucket - n), mode="edge").reshape(buckets, bucket)
+    arg_min = padded.argmin(axis=1)
+    arg_max = padded.argmax(axis=1)
+
+    offsets = np.arange(buckets)[:, None] * bucket
+    indices = np.sort(np.stack([arg_min, arg_max], axis=1), axis=1) + offsets
+    indices = np.minimum(indices.ravel(), n - 1)
+    return indices, values[indices]
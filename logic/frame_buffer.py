@@ -0,0 +1,74 @@
+import threading
+import numpy as np
+
+# Reused display buffers for the frame hand-off from the inference thread to the GUI.
+# The overlay is rendered once, directly in RGB and at the size the view asks for, into one of
+# a few preallocated buffers; the GUI wraps the published buffer in a QImage without copying.
+# Buffers handed out by acquire stay pending until they are published or released, so neither the
+# buffer on screen nor frames still waiting in the GUI's event queue are written to. If all buffers
+# are in use (fast scrubbing), an extra buffer is allocated instead.
+class FrameBuffer:
+    def __init__(self, num_buffers=3):
+        self.num_buffers = num_buffers
+        self.display_size = None  # (width, height) requested by the view, None for full size
+        self._buffers = []
+        self._pending = set()
+        self._front = None
+        self._next = 0
+        self._lock = threading.Lock()
+
+    # Function to get the size (h, w) a frame of src_h x src_w is displayed at:
+    # fitted into display_size with the aspect ratio kept, never upscaled
+    def fit(self, src_h, src_w):
+        if not self.display_size:
+            return src_h, src_w
+        box_w, box_h = self.display_size
+        scale = min(box_w / src_w, box_h / src_h, 1.0)
+        return max(int(round(src_h * scale)), 1), max(int(round(src_w * scale)), 1)
+
+    # Function to get a back buffer of shape (h, w, 3) to render the next frame into; it is pending
+    # until publish() or release()
+    def acquire(self, h, w):
+        with self._lock:
+            count = max(self.num_buffers, len(self._buffers))
+            for _ in range(count):
+                i = self._next
+                self._next = (self._next + 1) % count
+                if i >= len(self._buffers):
+                    self._buffers.append(None)
+                if i not in self._pending and (self._front is None or self._buffers[i] is not self._front):
+                    break
+            else:
+                i = len(self._buffers)
+                self._buffers.append(None)
+            buffer = self._buffers[i]
+            # Buffers are only reallocated when the display size or the video changes
+            if buffer is None or buffer.shape[:2] != (h, w):
+                buffer = np.empty((h, w, 3), dtype=np.uint8)
+                self._buffers[i] = buffer
+            self._pending.add(i)
+            return buffer
+
+    # Function to get the slot of a buffer (None for frames that are not one of the buffers)
+    def _slot(self, frame):
+        return next((i for i, buffer in enumerate(self._buffers) if frame is buffer), None)
+
+    # Function to give back an acquired buffer that will not be published (e.g. a stale frame)
+    def release(self, frame):
+        with self._lock:
+            self._pending.discard(self._slot(frame))
+
+    # Function to show a rendered frame; frames from elsewhere are copied into a back buffer once
+    def publish(self, frame):
+        if self._slot(frame) is None:
+            buffer = self.acquire(*frame.shape[:2])
+            np.copyto(buffer, frame)
+            frame = buffer
+        with self._lock:
+            self._pending.discard(self._slot(frame))
+            self._front = frame
+        return frame
+
+    @property
+    def front(self):
+        return self._front
@@ -1,15 +1,23 @@
 from PySide6.QtGui import QImage
 from PySide6.QtQuick import QQuickImageProvider
+from logic.frame_buffer import FrameBuffer
 
 # Frame Provider for QML to fetch video frames from the segmenter
 class FrameProvider(QQuickImageProvider): 
     def __init__(self):
         super().__init__(QQuickImageProvider.Image)
+        self.frame_buffer = FrameBuffer()
         self.current_frame = QImage()
 
     def requestImage(self, id, size, requestedSize):
+        # The view asks for its own size; the next frames are rendered to fit into it
+        if requestedSize.width() > 0 and requestedSize.height() > 0:
+            self.frame_buffer.display_size = (requestedSize.width(), requestedSize.height())
         return self.current_frame if not self.current_frame.isNull() else QImage(1, 1, QImage.Format_ARGB32)
 
-    def update_frame(self, cv_img):
-        h, w, ch = cv_img.shape
-        self.current_frame = QImage(cv_img.data, w, h, ch * w, QImage.Format_RGB888).rgbSwapped().copy()
\ No newline at end of file
+    # Function to show an RGB frame; frames rendered into frame_buffer are wrapped without a copy
+    # (the buffer stays referenced by frame_buffer while it is on screen)
+    def update_frame(self, frame):
+        frame = self.frame_buffer.publish(frame)
+        h, w, ch = frame.shape
+        self.current_frame = QImage(frame.data, w, h, ch * w, QImage.Format_RGB888)
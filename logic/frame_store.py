@@ -0,0 +1,286 @@
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+from logic.video_stream import iter_video_chunks, probe_video
+from logic.batch_resize import BatchResizer, target_shape
+from logic.profiler import Profiler
+
+# Class to keep decoded frames on disk as one contiguous (N, H, W, 3) uint8 array.
+# Frames are written chunk by chunk while decoding and read back through np.memmap,
+# so memory use does not grow with the length of the video. Indexing and slicing
+# return views into the mapping, the OS page cache takes care of eviction.
+class FrameStore:
+    def __init__(self, path, temporary=True):
+        self.path = path
+        self.temporary = temporary
+        self.frame_shape = None
+        self.num_frames = 0
+        self._frames = None
+        # Persistent stores are written under a temporary name and only show up in the cache once complete
+        # (per process, so parallel workers decoding the same clip do not write into the same file)
+        self._write_path = path if temporary else f"{path}.{os.getpid()}.part"
+        self._file = open(self._write_path, "wb")
+
+    # Function to map an already finished store, returns None if it does not exist or is incomplete
+    @classmethod
+    def open(cls, path):
+        try:
+            with open(path + ".json") as f:
+                meta = json.load(f)
+            shape = tuple(meta["shape"])
+            if os.path.getsize(path) != int(np.prod(shape)):
+                return None
+        except (OSError, ValueError, KeyError):
+            return None
+
+        store = cls.__new__(cls)
+        store.path = path
+        store.temporary = False
+        store.frame_shape = shape[1:]
+        store.num_frames = shape[0]
+        store._write_path = None
+        store._file = None
+        store._frames = np.memmap(path, dtype=np.uint8, mode="r", shape=shape)
+        # Touch the metadata so cache pruning sees the store as recently used
+        os.utime(path + ".json")
+        return store
+
+    # Function to append a chunk of frames to the store
+    def append(self, chunk):
+        if self._file is None:
+            raise ValueError("FrameStore is already finalized.")
+        if self.frame_shape is None:
+            self.frame_shape = tuple(chunk.shape[1:])
+        elif tuple(chunk.shape[1:]) != self.frame_shape:
+            raise ValueError(f"Frame shape {chunk.shape[1:]} does not match {self.frame_shape}.")
+
+        np.ascontiguousarray(chunk, dtype=np.uint8).tofile(self._file)
+        self.num_frames += len(chunk)
+
+    # Function to close the writer and map the frames for reading
+    def finalize(self):
+        self._file.close()
+        self._file = None
+        if self.num_frames == 0:
+            raise ValueError(f"No frames were written to {self.path}.")
+
+        if not self.temporary:
+            os.replace(self._write_path, self.path)
+            with open(self.path + ".json", "w") as f:
+                json.dump({"shape": list(self.shape)}, f)
+
+        self._frames = np.memmap(self.path, dtype=np.uint8, mode="r", shape=self.shape)
+        return self
+
+    @property
+    def shape(self):
+        return (self.num_frames, *self.frame_shape)
+
+    def __len__(self):
+        return self.num_frames
+
+    def __getitem__(self, idx):
+        return self._frames[idx]
+
+    # Function to iterate over the stored frames in chunks of views
+    def iter_chunks(self, chunk_size=64):
+        for start in range(0, self.num_frames, chunk_size):
+            yield self._frames[start:start + chunk_size]
+
+    # Function to release the mapping; temporary and unfinished stores also delete their file
+    def close(self):
+        unfinished = self._file is not None
+        if unfinished:
+            self._file.close()
+            self._file = None
+        self._frames = None
+        if self.temporary or unfinished:
+            try:
+                os.remove(self._write_path)
+            except OSError:
+                # File is gone already or still mapped by a view (Windows)
+                pass
+
+
+# Function to get the directory of the frame cache (SQUIRREL_CACHE_DIR)
+def default_cache_dir():
+    return os.getenv(
+        "SQUIRREL_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "squirrel_detector", "frames")
+    )
+
+
+# Function to get the directory for spilled frames (SQUIRREL_SPILL_DIR). By default it sits next to the
+# frame cache and not in the system temp dir, which is often a RAM-backed tmpfs.
+def default_spill_dir():
+    cache_dir = os.path.normpath(default_cache_dir())
+    return os.getenv("SQUIRREL_SPILL_DIR", os.path.join(os.path.dirname(cache_dir), "spill"))
+
+
+# Class to manage persistent frame stores keyed by the content hash of the source video
+class FrameCache:
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = cache_dir or default_cache_dir()
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("SQUIRREL_CACHE_MAX_GB", "20")) * 1024**3)
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._index_path = os.path.join(self.cache_dir, "hash_index.json")
+
+    # Function to get the content hash of a video, remembered per (path, size, mtime) to skip rehashing
+    def video_key(self, video_path):
+        stat = os.stat(video_path)
+        memo_key = f"{os.path.abspath(video_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        index = self._read_index()
+        if memo_key in index:
+            return index[memo_key]
+
+        digest = hashlib.blake2b(digest_size=16)
+        with open(video_path, "rb") as f:
+            for block in iter(lambda: f.read(8 * 1024 * 1024), b""):
+                digest.update(block)
+        key = digest.hexdigest()
+
+        index[memo_key] = key
+        try:
+            tmp_path = f"{self._index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self._index_path)
+        except OSError as e:
+            print(f"Could not update frame cache index: {e}")
+        return key
+
+    def path_for(self, name):
+        return os.path.join(self.cache_dir, f"{name}.u8")
+
+    # Function to open a cached store, returns None on a cache miss
+    def lookup(self, name):
+        return FrameStore.open(self.path_for(name))
+
+    # Function to create a new store that becomes part of the cache once finalized;
+    # expected_bytes is the estimated size of the new store, room for it is made before writing
+    def create(self, name, expected_bytes=0):
+        self.prune(reserve=expected_bytes)
+        return FrameStore(self.path_for(name), temporary=False)
+
+    # Function to check whether stores of nbytes can be cached at all
+    def fits(self, nbytes):
+        return nbytes <= self.max_bytes
+
+    # Function to delete least recently used stores until the cache plus reserve bytes fits into max_bytes
+    def prune(self, reserve=0):
+        stores = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".u8") and os.path.exists(entry.path + ".json"):
+                stores.append((os.path.getmtime(entry.path + ".json"), entry.stat().st_size, entry.path))
+
+        total = sum(size for _, size, _ in stores) + reserve
+        for _, size, path in sorted(stores):
+            if total <= self.max_bytes:
+                break
+            for p in (path + ".json", path):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+            total -= size
+
+    def _read_index(self):
+        try:
+            with open(self._index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+
+# Function to create a scratch directory for spilled frames of one video
+def create_spill_dir():
+    root = default_spill_dir()
+    os.makedirs(root, exist_ok=True)
+    path = tempfile.mkdtemp(prefix="squirrel_frames_", dir=root)
+    atexit.register(remove_spill_dir, path)
+    return path
+
+# Function to remove a scratch directory again
+def remove_spill_dir(path):
+    if path and os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+
+
+# Function to get the original and resized frame stores of a video.
+# Reopening a known clip maps the cached stores and skips decoding and resizing; otherwise the file
+# is decoded once in chunks and originals and resized frames go to disk right away, so peak memory
+# is bounded by the chunk size, not the video length. Without a frame_cache the stores are spilled
+# to a scratch directory. Returns (original_store, resized_store, spill_dir).
+def load_frames(video_path, target_size, frame_cache=None, chunk_size=64, resize_backend="opencv", profiler=None):
+    original_store = resized_store = spill_dir = None
+    if frame_cache is not None:
+        video_key = frame_cache.video_key(video_path)
+        original_name = f"{video_key}_original"
+        resized_name = f"{video_key}_{target_size}"
+        original_store = frame_cache.lookup(original_name)
+        resized_store = frame_cache.lookup(resized_name)
+        if original_store is not None and resized_store is not None:
+            print("Loaded frames from cache.")
+            return original_store, resized_store, None
+
+        # Clips that would not fit into the cache at all are spilled to temporary files instead
+        info = probe_video(video_path)
+        h, w = info["height"], info["width"]
+        resized_w, resized_h = target_shape(h, w, target_size) if h and w else (0, 0)
+        resized_bytes = info["frame_count"] * resized_h * resized_w * 3
+        original_bytes = info["frame_count"] * h * w * 3 if original_store is None else 0
+        if not frame_cache.fits(resized_bytes + original_bytes):
+            print(f"Frames of {video_path} (~{(resized_bytes + original_bytes) / 1024**3:.1f} GB) exceed the frame "
+                  f"cache limit, using temporary files.")
+            for store in (original_store, resized_store):
+                if store is not None:
+                    store.close()
+            original_store = resized_store = None
+            frame_cache = None
+
+    if frame_cache is not None:
+        resized_writer = frame_cache.create(resized_name, expected_bytes=resized_bytes + original_bytes)
+        if original_store is None:
+            original_writer = frame_cache.create(original_name, expected_bytes=resized_bytes + original_bytes)
+    else:
+        spill_dir = create_spill_dir()
+        original_writer = FrameStore(os.path.join(spill_dir, "original.u8"))
+        resized_writer = FrameStore(os.path.join(spill_dir, "resized.u8"))
+
+    # Only the target size changed: resize from the cached originals instead of decoding again
+    if original_store is not None:
+        chunks = original_store.iter_chunks(chunk_size)
+    else:
+        chunks = iter_video_chunks(video_path, chunk_size=chunk_size)
+
+    # Resize frames chunk-wise on a thread pool (or with torch interpolate)
+    resizer = BatchResizer(target_size, backend=resize_backend)
+    profiler = profiler or Profiler(enabled=False)
+    try:
+        for chunk in profiler.iterate("load.decode", chunks):
+            with profiler.stage("load.store"):
+                if original_store is None:
+                    original_writer.append(chunk)
+            with profiler.stage("load.resize"):
+                resized = resizer.resize(chunk)
+            with profiler.stage("load.store"):
+                resized_writer.append(resized)
+    except BaseException:
+        resized_writer.close()
+        if original_store is None:
+            original_writer.close()
+        remove_spill_dir(spill_dir)
+        raise
+    finally:
+        resizer.close()
+    print(resizer.report())
+
+    if original_store is None:
+        original_store = original_writer.finalize()
+    resized_store = resized_writer.finalize()
+    return original_store, resized_store, spill_dir
@@ -0,0 +1,54 @@
+import warnings
+import torch
+
+# Selection of device, precision and execution mode for the SAM3 model.
+# Precisions: float32, bfloat16, float16 (GPU only) and int8 (dynamically quantized Linear layers,
+# CPU only). "auto" picks bfloat16 on a GPU and float32 on the CPU, where bfloat16 is emulated
+# on most processors and slower than float32.
+
+PRECISIONS = ("auto", "float32", "bfloat16", "float16", "int8")
+DTYPES = {"float32": torch.float32, "bfloat16": torch.bfloat16, "float16": torch.float16, "int8": torch.float32}
+
+
+# Function to get the inference device (torch.device), default: first GPU if available
+def resolve_device(device=None):
+    if device is None:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+    return torch.device(device)
+
+
+# Function to get the concrete precision name and the dtype of activations/frames for a device
+def resolve_precision(precision, device):
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision {precision!r}, expected one of {PRECISIONS}.")
+    if precision == "auto":
+        precision = "bfloat16" if device.type == "cuda" else "float32"
+    if precision == "int8" and device.type != "cpu":
+        raise ValueError("int8 dynamic quantization is only available on the CPU.")
+    if precision == "float16" and device.type == "cpu":
+        raise ValueError("float16 is not supported on the CPU, use float32 or bfloat16.")
+    return precision, DTYPES[precision]
+
+
+# Function to set the number of CPU threads used by torch; without num_threads the current setting
+# (torch default or set by the worker pool) is kept. Returns the thread count in use.
+def set_num_threads(num_threads=None):
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    return torch.get_num_threads()
+
+
+# Function to move a loaded model to the device and precision and optionally compile it
+def prepare_model(model, device, precision, compile_model=False):
+    model = model.to(device, dtype=DTYPES[precision]).eval()
+    if precision == "int8":
+        # Weights of all Linear layers become int8, activations are quantized on the fly
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            from torch.ao.quantization import quantize_dynamic
+            model = quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    if compile_model:
+        # Compiles the forward of the model in place, so propagate_in_video_iterator uses it too.
+        # The first frames are slow while the graphs are built.
+        model.compile(dynamic=True)
+    return model
@@ -0,0 +1,117 @@
+import numpy as np
+from logic.results import bbox_iou, FLAG_INTERPOLATED, FLAG_GATED
+
+# Keyframe mode for long recordings of static cameras: the model only runs on selected frames
+# (every step-th frame and/or frames whose content changed) and the frames in between are filled in.
+# The filler also takes care of frames removed by the motion gate (see logic/motion_gate.py).
+
+FILL_MODES = ("interpolate", "carry")
+
+
+# Function to get a small RGB thumbnail of every frame of a chunk (every 8th pixel)
+def _thumbnails(chunk):
+    return chunk[:, ::8, ::8].astype(np.float32)
+
+
+# Function to select the keyframes among the frames [start, end) of a frame store.
+# step runs the model at least every step frames; with diff_threshold a frame also becomes a keyframe
+# when more than diff_threshold (0-1) of its pixels changed against the last keyframe. As in the motion
+# gate, a pixel changed when one of its channels differs by more than pixel_threshold (0-255), so a small
+# animal moving through a static scene triggers a keyframe although the mean difference stays tiny.
+# The first and the last frame are always keyframes, so every skipped frame lies between two keyframes.
+# An empty range has no keyframes.
+def select_keyframes(frames, start=0, end=None, step=None, diff_threshold=None, pixel_threshold=20, chunk_size=64):
+    end = len(frames) if end is None else min(end, len(frames))
+    if start >= end:
+        return np.zeros(0, dtype=np.int64)
+    if diff_threshold is None:
+        keyframes = list(range(start, end, step or 1))
+    else:
+        keyframes = [start]
+        reference = _thumbnails(frames[start:start + 1])[0]
+        for chunk_start in range(start, end, chunk_size):
+            thumbs = _thumbnails(frames[chunk_start:min(chunk_start + chunk_size, end)])
+            for offset, thumb in enumerate(thumbs):
+                frame_idx = chunk_start + offset
+                if frame_idx == start:
+                    continue
+                changed = (np.abs(thumb - reference).max(axis=2) > pixel_threshold).mean() > diff_threshold
+                if changed or (step and frame_idx - keyframes[-1] >= step):
+                    keyframes.append(frame_idx)
+                    reference = thumb
+
+    if keyframes[-1] != end - 1:
+        keyframes.append(end - 1)
+    return np.asarray(keyframes, dtype=np.int64)
+
+
+# Class to fill in the frames the model did not see while the session results arrive in order.
+# Frames marked in gated (motion gate) get zero area and no bbox. Keyframe gaps are filled by
+# "carry" (repeat the last keyframe) or "interpolate" (area and bbox blended linearly between two
+# detected keyframes); masks and detection changes are taken from the nearest keyframe.
+class KeyframeFiller:
+    def __init__(self, mode="interpolate", start=0, gated=None):
+        if mode not in FILL_MODES:
+            raise ValueError(f"Unknown fill mode {mode!r}, expected one of {FILL_MODES}.")
+        self.mode = mode
+        self.gated = gated
+        self.next_idx = start
+        self.last = None
+
+    # Function to expand a batch of session results (frame_idx, area, bbox, mask) into all frames;
+    # returns (frame_idx, area, bbox, mask, flags) tuples in frame order
+    def fill(self, results):
+        expanded = []
+        for current in results:
+            expanded.extend(self._between(self.last, current, self.next_idx, current[0]))
+            expanded.append((*current, 0))
+            self.last = current
+            self.next_idx = current[0] + 1
+        return expanded
+
+    # Function to fill the frames after the last session frame up to end
+    def finish(self, end):
+        expanded = list(self._between(self.last, None, self.next_idx, end))
+        self.next_idx = max(self.next_idx, end)
+        return expanded
+
+    def _between(self, prev, nxt, first, last):
+        for frame_idx in range(first, last):
+            if self.gated is not None and self.gated[frame_idx]:
+                yield frame_idx, 0, None, None, FLAG_GATED
+            elif prev is None and nxt is None:
+                yield frame_idx, 0, None, None, FLAG_INTERPOLATED
+            elif prev is None or nxt is None:
+                # Before the first or after the last session frame: only one side is known
+                _, area, bbox, mask = prev or nxt
+                yield frame_idx, area, bbox, mask, FLAG_INTERPOLATED
+            else:
+                yield (frame_idx, *self._estimate(prev, nxt, frame_idx), FLAG_INTERPOLATED)
+
+    def _estimate(self, prev, nxt, frame_idx):
+        prev_idx, prev_area, prev_bbox, prev_mask = prev
+        next_idx, next_area, next_bbox, next_mask = nxt
+        t = (frame_idx - prev_idx) / (next_idx - prev_idx)
+        if self.mode == "carry":
+            return prev_area, prev_bbox, prev_mask
+        if prev_bbox is not None and next_bbox is not None:
+            area = round(prev_area + t * (next_area - prev_area))
+            bbox = [round(a + t * (b - a)) for a, b in zip(prev_bbox, next_bbox)]
+            return area, bbox, prev_mask if t <= 0.5 else next_mask
+        return (prev_area, prev_bbox, prev_mask) if t <= 0.5 else (next_area, next_bbox, next_mask)
+
+
+# Function to compare a keyframe run with a full run of the same frames.
+# Returns the mean absolute and relative area error, the share of frames with the same detection
+# state and the mean bbox IoU over frames detected in both runs.
+def compare_results(reference, candidate):
+    ref_area = reference["area"].astype(np.float64)
+    area_error = np.abs(candidate["area"] - ref_area)
+    both = reference.detected & candidate.detected
+    iou = bbox_iou(reference, candidate)
+    return {
+        "area_mae": float(area_error.mean()),
+        "area_rel_error": float(area_error.sum() / max(ref_area.sum(), 1.0)),
+        "detection_agreement": float((reference.detected == candidate.detected).mean()),
+        "bbox_iou": float(iou[both].mean()) if both.any() else 1.0,
+    }
@@ -0,0 +1,220 @@
+import io
+import json
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+import numpy as np
+from logic.overlay import mask_bbox
+from logic.results import SegmentationResults, ObjectResults, COLUMNS, OBJECT_COLUMNS
+
+# Archive of the propagated masks, so an analysed clip can be reopened and re-exported without the model.
+# Every mask is cropped to its bbox and bit-packed (1 bit per pixel); the crops of chunk_size frames
+# are deflate-compressed together, which turns the long runs of equal bits into a few bytes.
+# Layout: MAGIC | chunk 0 | chunk 1 | ... | footer (npz) | footer offset (uint64) | MAGIC
+# The footer holds the frame index (chunk, offset and bbox of every frame, for random access),
+# the per-frame and per-object result columns and the metadata (video path, prompts, mask size, ...).
+
+MAGIC = b"SQMASK01"
+_TAIL = struct.Struct("<Q8s")
+
+
+# Class to write an archive frame by frame; the file is written to output_path + ".part" and
+# renamed when it is closed, so an interrupted run never leaves a truncated archive behind
+class MaskArchiveWriter:
+    def __init__(self, output_path, chunk_size=64, level=6):
+        self.output_path = output_path
+        self.chunk_size = chunk_size
+        self.level = level
+        self.shape = None
+        self.file = open(output_path + ".part", "wb")
+        self.file.write(MAGIC)
+        self._chunk = []
+        self._chunk_bytes = 0
+        self._chunk_offsets = []
+        self._chunk_sizes = []
+        # Per frame: frame_idx, chunk, offset and length inside the decompressed chunk, bbox
+        self._index = []
+        self._last_mask = None
+        self._last_entry = None
+
+    # Function to add the mask of a frame (bool array (H, W) or None if nothing was detected)
+    def add(self, frame_idx, mask):
+        # Frames filled in by keyframe mode share the mask object of their keyframe and point to its entry
+        if mask is not None and mask is self._last_mask:
+            self._index.append((frame_idx, *self._last_entry))
+            return
+        bbox = mask_bbox(mask) if mask is not None else None
+        if bbox is None:
+            self._index.append((frame_idx, -1, 0, 0, -1, -1, -1, -1))
+            return
+        if self.shape is None:
+            self.shape = mask.shape
+        x_min, y_min, x_max, y_max = bbox
+        packed = np.packbits(mask[y_min:y_max + 1, x_min:x_max + 1]).tobytes()
+        self._last_mask = mask
+        self._last_entry = (len(self._chunk_offsets), self._chunk_bytes, len(packed), *bbox)
+        self._index.append((frame_idx, *self._last_entry))
+        self._chunk.append(packed)
+        self._chunk_bytes += len(packed)
+        if len(self._chunk) >= self.chunk_size:
+            self._flush_chunk()
+
+    def _flush_chunk(self):
+        if not self._chunk:
+            return
+        data = zlib.compress(b"".join(self._chunk), self.level)
+        self._chunk_offsets.append(self.file.tell())
+        self._chunk_sizes.append(len(data))
+        self.file.write(data)
+        self._chunk = []
+        self._chunk_bytes = 0
+
+    # Function to write the index, results and metadata and close the file
+    def close(self, results=None, objects=None, metadata=None):
+        if self.file.closed:
+            return
+        self._flush_chunk()
+        index = np.array(self._index, dtype=np.int64).reshape(-1, 8)
+        metadata = dict(metadata or {})
+        if self.shape is not None:
+            metadata["mask_shape"] = list(self.shape)
+        arrays = {
+            "index": index,
+            "chunk_offsets": np.array(self._chunk_offsets, dtype=np.int64),
+            "chunk_sizes": np.array(self._chunk_sizes, dtype=np.int64),
+            "metadata": np.array(json.dumps(metadata)),
+        }
+        if results is not None:
+            arrays.update({f"result_{name}": results[name] for name in COLUMNS})
+        if objects is not None:
+            arrays.update({f"object_{name}": objects[name] for name in OBJECT_COLUMNS})
+            arrays["object_prompts"] = np.array(objects.prompts, dtype=str)
+
+        footer = io.BytesIO()
+        np.savez_compressed(footer, **arrays)
+        footer_offset = self.file.tell()
+        self.file.write(footer.getvalue())
+        self.file.write(_TAIL.pack(footer_offset, MAGIC))
+        self.file.close()
+        os.replace(self.output_path + ".part", self.output_path)
+
+    # Size of the masks written so far in bytes (compressed chunks only)
+    @property
+    def nbytes(self):
+        return sum(self._chunk_sizes)
+
+
+# Class to read an archive; masks are decoded on demand (random access by frame index) and the last
+# few decompressed chunks are kept, so playing or exporting the clip decompresses every chunk once.
+# Safe to use from several threads.
+class MaskArchive:
+    def __init__(self, path, cached_chunks=4):
+        self.path = path
+        self.cached_chunks = cached_chunks
+        self.file = open(path, "rb")
+        self._lock = threading.Lock()
+        self._chunks = OrderedDict()
+        try:
+            self.file.seek(-_TAIL.size, os.SEEK_END)
+            footer_offset, magic = _TAIL.unpack(self.file.read(_TAIL.size))
+            self.file.seek(0)
+            if magic != MAGIC or self.file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a mask archive.")
+            self.file.seek(footer_offset)
+            footer = self.file.read(os.path.getsize(path) - _TAIL.size - footer_offset)
+            with np.load(io.BytesIO(footer)) as data:
+                arrays = {name: data[name] for name in data.files}
+        except Exception:
+            self.file.close()
+            raise
+
+        self.metadata = json.loads(str(arrays["metadata"]))
+        self.shape = tuple(self.metadata["mask_shape"]) if self.metadata.get("mask_shape") else None
+        index = arrays["index"]
+        self.frame_indices = index[:, 0]
+        self._chunk_of = index[:, 1]
+        self._offset = index[:, 2]
+        self._length = index[:, 3]
+        self.bboxes = index[:, 4:].astype(np.int32)
+        self._chunk_offsets = arrays["chunk_offsets"]
+        self._chunk_sizes = arrays["chunk_sizes"]
+
+        self.results = None
+        if "result_frame_idx" in arrays:
+            self.results = SegmentationResults.from_columns({name: arrays[f"result_{name}"] for name in COLUMNS})
+        self.object_results = None
+        if "object_frame_idx" in arrays:
+            prompts = arrays["object_prompts"].tolist() if "object_prompts" in arrays else []
+            self.object_results = ObjectResults.from_columns(
+                {name: arrays[f"object_{name}"] for name in OBJECT_COLUMNS}, prompts
+            )
+
+    def __len__(self):
+        return len(self.frame_indices)
+
+    def __contains__(self, frame_idx):
+        return self._row(frame_idx) is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Text prompts of the run the archive was written by
+    @property
+    def prompts(self):
+        return self.metadata.get("prompts", [])
+
+    # Function to get the index row of a frame (None if the frame is not in the archive)
+    def _row(self, frame_idx):
+        row = int(np.searchsorted(self.frame_indices, frame_idx))
+        if row == len(self.frame_indices) or self.frame_indices[row] != frame_idx:
+            return None
+        return row
+
+    # Function to get the decompressed bytes of a chunk
+    def _chunk(self, chunk):
+        with self._lock:
+            data = self._chunks.get(chunk)
+            if data is not None:
+                self._chunks.move_to_end(chunk)
+                return data
+            self.file.seek(int(self._chunk_offsets[chunk]))
+            compressed = self.file.read(int(self._chunk_sizes[chunk]))
+        data = zlib.decompress(compressed)
+        with self._lock:
+            self._chunks[chunk] = data
+            while len(self._chunks) > self.cached_chunks:
+                self._chunks.popitem(last=False)
+        return data
+
+    # Function to get the bbox (x_min, y_min, x_max, y_max) of the mask of a frame, None if it is empty
+    def bbox(self, frame_idx):
+        row = self._row(frame_idx)
+        if row is None or self._chunk_of[row] < 0:
+            return None
+        return tuple(self.bboxes[row].tolist())
+
+    # Function to get the mask of a frame as bool array (H, W); None if nothing was detected.
+    # Raises KeyError for frames that are not in the archive.
+    def get(self, frame_idx):
+        row = self._row(frame_idx)
+        if row is None:
+            raise KeyError(f"Frame {frame_idx} is not in the mask archive.")
+        chunk = self._chunk_of[row]
+        if chunk < 0:
+            return None
+        offset, length = int(self._offset[row]), int(self._length[row])
+        packed = np.frombuffer(self._chunk(int(chunk)), dtype=np.uint8, count=length, offset=offset)
+        x_min, y_min, x_max, y_max = self.bboxes[row].tolist()
+        crop_shape = (y_max - y_min + 1, x_max - x_min + 1)
+        mask = np.zeros(self.shape, dtype=bool)
+        crop = np.unpackbits(packed, count=crop_shape[0] * crop_shape[1]).reshape(crop_shape)
+        mask[y_min:y_max + 1, x_min:x_max + 1] = crop.view(bool)
+        return mask
+
+    def close(self):
+        self.file.close()
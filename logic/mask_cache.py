@@ -0,0 +1,60 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# LRU cache of segmentation masks keyed by (frame index, prompt).
+# Masks are stored bit-packed (1 bit per pixel) and the least recently used entries are evicted
+# once the packed masks exceed max_bytes. Frames without a detection are cached as well.
+class MaskCache:
+    def __init__(self, max_bytes=256 * 1024**2):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Function to look up a mask; returns (hit, mask) where mask is a bool array or None (no detection)
+    def get(self, frame_idx, prompt):
+        key = (frame_idx, prompt)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        packed, shape = entry
+        if packed is None:
+            return True, None
+        mask = np.unpackbits(packed, count=shape[0] * shape[1]).reshape(shape)
+        return True, mask.view(bool)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    # Function to store the mask of a frame (bool array of shape (H, W) or None)
+    def put(self, frame_idx, prompt, mask):
+        entry = (None, None) if mask is None else (np.packbits(mask.ravel()), mask.shape)
+        size = entry[0].nbytes if entry[0] is not None else 0
+        key = (frame_idx, prompt)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None and old[0] is not None:
+                self.nbytes -= old[0].nbytes
+            self._entries[key] = entry
+            self.nbytes += size
+            while self.nbytes > self.max_bytes and len(self._entries) > 1:
+                packed, _ = self._entries.popitem(last=False)[1]
+                if packed is not None:
+                    self.nbytes -= packed.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def __len__(self):
+        return len(self._entries)
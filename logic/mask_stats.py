@@ -0,0 +1,93 @@
+import torch
+from logic.profiler import Profiler
+
+# Function to compute area and bbox of a batch of binary masks (B, H, W) with tensor reductions
+# on the device the masks live on. Returns area (B,) and bbox (B, 4) as x_min, y_min, x_max, y_max;
+# the bbox of an empty mask is -1.
+def mask_stats(masks):
+    masks = masks.bool()
+    _, h, w = masks.shape
+    area = masks.sum(dim=(1, 2))
+
+    rows = masks.any(dim=2)
+    cols = masks.any(dim=1)
+    ys = torch.arange(h, device=masks.device)
+    xs = torch.arange(w, device=masks.device)
+    y_min = torch.where(rows, ys, h).amin(dim=1)
+    y_max = torch.where(rows, ys, -1).amax(dim=1)
+    x_min = torch.where(cols, xs, w).amin(dim=1)
+    x_max = torch.where(cols, xs, -1).amax(dim=1)
+
+    bbox = torch.stack([x_min, y_min, x_max, y_max], dim=1)
+    bbox[area == 0] = -1
+    return area, bbox
+
+
+# Class to collect per-frame masks during propagation and reduce them in batches.
+# Masks stay on the model's device until a batch is full; then area and bbox of the whole batch
+# are computed on the device and copied to the host in one transfer. Full masks are only copied
+# to the host when keep_masks is set (for overlays or exports).
+# With several tracked objects per frame the frame mask is their union; area and bbox of the single
+# objects are reduced in the same batch and collected in objects (frame_idx -> rows).
+class MaskStatsBatcher:
+    def __init__(self, batch_size=16, keep_masks=True, profiler=None):
+        self.batch_size = batch_size
+        self.profiler = profiler or Profiler(enabled=False)
+        self.keep_masks = keep_masks
+        self.pending = []
+        self.objects = {}
+
+    # Function to queue the mask of one frame, mask is None if nothing was detected.
+    # objects is (object_ids, prompts, masks (N, H, W)) of the tracked objects or None.
+    def add(self, frame_idx, mask, objects=None):
+        self.pending.append((frame_idx, mask, objects))
+
+    def full(self):
+        return len(self.pending) >= self.batch_size
+
+    # Function to reduce all queued frames; returns a list of (frame_idx, area, bbox, host_mask)
+    # in queue order. bbox is None and host_mask is None for frames without a mask.
+    # Rows (object_id, prompt, area, bbox) of the objects are added to self.objects.
+    def flush(self):
+        pending, self.pending = self.pending, []
+        detected = [mask for _, mask, _ in pending if mask is not None]
+        # Frames with a single object reuse the stats of the frame mask
+        object_masks = [objects[2] for _, mask, objects in pending if mask is not None and objects and len(objects[0]) > 1]
+
+        areas, bboxes, host_masks = [], [], []
+        if detected:
+            with self.profiler.stage("propagate.mask_stats"):
+                batch = torch.stack(detected)
+                stacked = torch.cat([batch, *object_masks]) if object_masks else batch
+                area, bbox = mask_stats(stacked)
+                areas = area.cpu().tolist()
+                bboxes = bbox.cpu().tolist()
+            if self.keep_masks:
+                with self.profiler.stage("propagate.host_copy"):
+                    host_masks = list(batch.cpu().numpy())
+
+        results = []
+        k = 0
+        o = len(detected)
+        for frame_idx, mask, objects in pending:
+            if mask is None or areas[k] == 0:
+                results.append((frame_idx, 0, None, None))
+            else:
+                host_mask = host_masks[k] if self.keep_masks else None
+                results.append((frame_idx, int(areas[k]), bboxes[k], host_mask))
+                if objects:
+                    object_ids, prompts, _ = objects
+                    if len(object_ids) == 1:
+                        rows = [(object_ids[0], prompts[0], int(areas[k]), bboxes[k])]
+                    else:
+                        rows = [
+                            (object_id, prompt, int(areas[o + j]), bboxes[o + j])
+                            for j, (object_id, prompt) in enumerate(zip(object_ids, prompts))
+                            if areas[o + j] > 0
+                        ]
+                    self.objects[frame_idx] = rows
+            if mask is not None:
+                if objects and len(objects[0]) > 1:
+                    o += len(objects[0])
+                k += 1
+        return results
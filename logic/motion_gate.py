@@ -0,0 +1,71 @@
+import numpy as np
+
+# Motion pre-filter for static cameras: frames without motion against a background model are
+# gated, i.e. they get zero area and no bbox without ever reaching the model.
+
+
+# Class to find the frames with motion on downscaled RGB thumbnails of the frame store.
+# A pixel is foreground when one of its channels differs from the background by more than
+# pixel_threshold (0-255), so colour changes of similar brightness (a brown squirrel on green grass)
+# count as well. A frame has motion when more than min_fraction of its pixels are foreground. The
+# background is only updated on background pixels, so a squirrel that sits still stays foreground;
+# a change of more than reset_fraction of the image (lighting, camera moved) resets it. pad frames
+# before and after every motion frame stay active, so the tracker sees objects enter and leave.
+class MotionGate:
+    def __init__(self, pixel_threshold=20, min_fraction=0.001, pad=8, learning_rate=0.05,
+                 reset_fraction=0.5, scale=8):
+        self.pixel_threshold = pixel_threshold
+        self.min_fraction = min_fraction
+        self.pad = pad
+        self.learning_rate = learning_rate
+        self.reset_fraction = reset_fraction
+        self.scale = scale
+
+        # Counters to tune the thresholds
+        self.frames_checked = 0
+        self.frames_gated = 0
+        self.model_calls_skipped = 0
+        self.motion_fraction = None
+
+    # Function to get a bool array over the frames [start, end) that is True for frames with motion
+    def analyze(self, frames, start=0, end=None, chunk_size=64):
+        end = len(frames) if end is None else min(end, len(frames))
+        fractions = np.zeros(end - start, dtype=np.float32)
+        background = None
+        for chunk_start in range(start, end, chunk_size):
+            chunk = frames[chunk_start:min(chunk_start + chunk_size, end)]
+            thumbs = chunk[:, ::self.scale, ::self.scale].astype(np.float32)
+            for offset, thumb in enumerate(thumbs):
+                if background is None:
+                    # Nothing to compare the first frame with, it always goes to the model
+                    background = thumb.copy()
+                    fractions[chunk_start - start + offset] = 1.0
+                    continue
+
+                foreground = np.abs(thumb - background).max(axis=2) > self.pixel_threshold
+                fraction = foreground.mean()
+                fractions[chunk_start - start + offset] = fraction
+                if fraction > self.reset_fraction:
+                    background = thumb.copy()
+                else:
+                    update = ~foreground
+                    background[update] += self.learning_rate * (thumb[update] - background[update])
+
+        motion = fractions > self.min_fraction
+        if self.pad > 0 and len(motion) > 0:
+            # "full" and cropping keeps len(motion) values, also for ranges shorter than the kernel
+            kernel = np.ones(2 * self.pad + 1)
+            motion = np.convolve(motion, kernel, mode="full")[self.pad:self.pad + len(motion)] > 0
+
+        self.motion_fraction = fractions
+        self.frames_checked += len(motion)
+        self.frames_gated += int((~motion).sum())
+        return motion
+
+    # Function to get the counters as a dict (e.g. for logging or the batch summary)
+    def stats(self):
+        return {
+            "frames_checked": self.frames_checked,
+            "frames_gated": self.frames_gated,
+            "model_calls_skipped": self.model_calls_skipped,
+        }
@@ -0,0 +1,91 @@
+import threading
+import cv2 as cv
+import numpy as np
+
+# Renders the low-resolution model mask onto frames of any resolution (preview, export).
+# Only the bbox of the mask is upscaled and blended, so the cost per frame depends on the size of
+# the squirrel and not on the size of the frame. Index maps and scratch buffers are cached per
+# (mask size, output size) and per thread, so the renderer can be shared by the worker pool.
+
+
+# Function to get the bbox (x_min, y_min, x_max, y_max) of a binary mask, None if it is empty
+def mask_bbox(mask):
+    rows = np.flatnonzero(mask.any(axis=1))
+    if len(rows) == 0:
+        return None
+    cols = np.flatnonzero(mask.any(axis=0))
+    return int(cols[0]), int(rows[0]), int(cols[-1]), int(rows[-1])
+
+
+class OverlayRenderer:
+    def __init__(self, color=(0, 255, 0), alpha=0.5):
+        self.color = color
+        self.alpha = alpha
+        self._local = threading.local()
+
+    # Function to get the nearest-neighbour index maps from output pixels to mask pixels
+    # (same mapping as cv.resize with INTER_NEAREST) and the inverse bounds per mask pixel
+    def _maps(self, mask_shape, out_shape):
+        maps = getattr(self._local, "maps", None)
+        if maps is None:
+            maps = self._local.maps = {}
+        key = (mask_shape, out_shape)
+        if key not in maps:
+            (mask_h, mask_w), (out_h, out_w) = mask_shape, out_shape
+            ys = np.minimum(np.floor(np.arange(out_h) * (mask_h / out_h)).astype(np.intp), mask_h - 1)
+            xs = np.minimum(np.floor(np.arange(out_w) * (mask_w / out_w)).astype(np.intp), mask_w - 1)
+            # First output row/column of every mask row/column (+ end), for mapping the bbox
+            y_start = np.searchsorted(ys, np.arange(mask_h + 1))
+            x_start = np.searchsorted(xs, np.arange(mask_w + 1))
+            maps[key] = ys, xs, y_start, x_start
+        return maps[key]
+
+    # Function to get a scratch buffer of at least shape (h, w, 3) filled with the overlay colour
+    def _color_tile(self, h, w):
+        tile = getattr(self._local, "tile", None)
+        if tile is None or tile.shape[0] < h or tile.shape[1] < w:
+            shape = (max(h, 0 if tile is None else tile.shape[0]), max(w, 0 if tile is None else tile.shape[1]), 3)
+            tile = np.empty(shape, dtype=np.uint8)
+            tile[:] = self.color
+            self._local.tile = tile
+            self._local.blend = np.empty(shape, dtype=np.uint8)
+        return tile[:h, :w], self._local.blend[:h, :w]
+
+    # Function to draw mask onto frame.
+    # frame: RGB frame at any resolution, mask: binary mask at model resolution (or None),
+    # bbox: bbox of mask in mask pixels if already known, out: buffer to render into (frame is copied
+    # or resized into it; a new array is allocated if None), alpha: None for the renderer default,
+    # 1.0 for a solid fill. Returns the rendered frame.
+    def render(self, frame, mask, bbox=None, out=None, alpha=None):
+        if out is None:
+            out = frame.copy()
+        elif out.shape == frame.shape:
+            np.copyto(out, frame)
+        else:
+            cv.resize(frame, (out.shape[1], out.shape[0]), dst=out, interpolation=cv.INTER_AREA)
+        if mask is None:
+            return out
+        if bbox is None:
+            bbox = mask_bbox(mask)
+            if bbox is None:
+                return out
+
+        # Output rectangle covered by the bbox and the mask pixels behind every output pixel in it
+        ys, xs, y_start, x_start = self._maps(mask.shape[:2], out.shape[:2])
+        x_min, y_min, x_max, y_max = bbox
+        y0, y1 = y_start[y_min], y_start[y_max + 1]
+        x0, x1 = x_start[x_min], x_start[x_max + 1]
+        if y0 >= y1 or x0 >= x1:
+            return out
+        roi_mask = mask[ys[y0:y1, None], xs[None, x0:x1]]
+        roi = out[y0:y1, x0:x1]
+
+        alpha = self.alpha if alpha is None else alpha
+        if alpha >= 1.0:
+            roi[roi_mask] = self.color
+        else:
+            # Same rounding as blending a full overlay copy with cv.addWeighted
+            tile, blend = self._color_tile(y1 - y0, x1 - x0)
+            cv.addWeighted(tile, alpha, roi, 1.0 - alpha, 0, dst=blend)
+            np.copyto(roi, blend, where=roi_mask[..., None])
+        return out
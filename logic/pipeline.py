@@ -0,0 +1,76 @@
+import queue
+import threading
+from collections import deque
+
+_DONE = object()
+_READY = object()
+
+# Generator that overlaps a slow producer with post-processing.
+# The source iterator (e.g. the SAM3 propagation loop) runs in its own thread and feeds a
+# queue, every item is handed to fn on the given thread pool and the results are yielded in
+# source order. At most max_in_flight items are queued or being processed together (the producer
+# takes a slot before queueing an item, the consumer frees it when the result is taken), so a
+# slow consumer applies backpressure to the producer instead of piling up frames. Results are
+# yielded as soon as the oldest item is done, the consumer never waits for a full window.
+# Without a pool everything runs serially in the calling thread.
+def ordered_pipeline(source, fn, pool=None, max_in_flight=16):
+    if pool is None:
+        for item in source:
+            yield fn(item)
+        return
+
+    items = queue.Queue()
+    slots = threading.Semaphore(max_in_flight)
+    stop = threading.Event()
+    errors = []
+
+    def produce():
+        try:
+            iterator = iter(source)
+            while True:
+                # The slot is taken before the next item is pulled, so no extra frame waits in the producer
+                while not slots.acquire(timeout=0.1):
+                    if stop.is_set():
+                        return
+                item = next(iterator, _DONE)
+                if item is _DONE:
+                    return
+                items.put(item)
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            items.put(_DONE)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    pending = deque()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                break
+            if item is not _READY:
+                future = pool.submit(fn, item)
+                # Finished items wake the consumer up, also while the producer is still busy
+                future.add_done_callback(lambda _: items.put(_READY))
+                pending.append(future)
+            # Finished results are handed on in order; when all slots are taken by submitted items
+            # the producer waits, so the consumer blocks on the oldest result
+            while pending and (pending[0].done() or len(pending) >= max_in_flight):
+                result = pending.popleft().result()
+                slots.release()
+                yield result
+
+        while pending:
+            result = pending.popleft().result()
+            slots.release()
+            yield result
+        if errors:
+            raise errors[0]
+    finally:
+        # Consumer stopped early or failed: let the producer finish and drop queued work
+        stop.set()
+        for future in pending:
+            future.cancel()
+        producer.join()
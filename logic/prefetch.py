@@ -0,0 +1,130 @@
+import threading
+import time
+
+# Background inference worker for interactive scrubbing.
+# The GUI only records the requested frame; a worker thread segments and renders it and then
+# speculatively segments frames ahead of (and a few behind) the cursor, following the scrub
+# direction and stride. Every new request bumps a generation counter, which makes queued
+# prefetch work and stale results of the previous request get dropped.
+# All model calls run under model_lock, so propagation or loading a new video can hold the lock
+# to keep the scheduler away from the model.
+class PrefetchScheduler:
+    # With a frame_buffer (logic/frame_buffer.py) requested frames are rendered straight into its
+    # display buffers at display size
+    def __init__(self, segmenter, on_frame_ready, ahead=8, behind=3, max_stride=8, frame_buffer=None):
+        self.segmenter = segmenter
+        self.on_frame_ready = on_frame_ready
+        self.frame_buffer = frame_buffer
+        self.ahead = ahead
+        self.behind = behind
+        self.max_stride = max_stride
+        self.model_lock = threading.RLock()
+
+        self._cond = threading.Condition()
+        self._generation = 0
+        self._target = None
+        self._last_idx = None
+        self._last_time = None
+        self._direction = 1
+        self._stride = 1
+        self._running = True
+        self.prefetched = 0
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # Function to request a frame from the GUI thread; never blocks on the model
+    def request(self, frame_idx):
+        now = time.monotonic()
+        with self._cond:
+            if self._last_idx is not None and frame_idx != self._last_idx:
+                step = frame_idx - self._last_idx
+                self._direction = 1 if step > 0 else -1
+                # Fast scrubbing (big jumps in short time) prefetches with a wider stride
+                recent = now - self._last_time < 0.25
+                self._stride = min(abs(step), self.max_stride) if recent else 1
+            self._last_idx = frame_idx
+            self._last_time = now
+            self._target = frame_idx
+            self._generation += 1
+            self._cond.notify()
+
+    # Function to forget the scrub history, e.g. after a new video was loaded
+    def reset(self):
+        with self._cond:
+            self._generation += 1
+            self._target = None
+            self._last_idx = None
+            self._direction = 1
+            self._stride = 1
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._generation += 1
+            self._cond.notify()
+        self._thread.join()
+
+    def _is_current(self, generation):
+        return generation == self._generation and self._running
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and self._target is None:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                frame_idx = self._target
+                generation = self._generation
+                direction, stride = self._direction, self._stride
+                self._target = None
+
+            # Serve the requested frame first
+            out = None
+            try:
+                with self.model_lock:
+                    if not self._is_current(generation) or self.segmenter.video_frames is None:
+                        continue
+                    if self.frame_buffer is not None:
+                        src_h, src_w = self.segmenter.video_frames_original_size.shape[1:3]
+                        out = self.frame_buffer.acquire(*self.frame_buffer.fit(src_h, src_w))
+                    frame = self.segmenter.showSingleFrame(frame_idx, return_frame_only=True, out=out)
+            except Exception as e:
+                print(f"Frame {frame_idx} failed: {e}")
+                if out is not None:
+                    self.frame_buffer.release(out)
+                continue
+            if self._is_current(generation):
+                self.on_frame_ready(frame_idx, frame)
+            elif out is not None:
+                # Stale frames are never shown, their buffer is free again
+                self.frame_buffer.release(out)
+
+            # Then speculatively segment the neighbourhood until the slider moves again
+            for idx in self._prefetch_order(frame_idx, direction, stride):
+                if not self._is_current(generation):
+                    break
+                if (idx, self.segmenter.prompt) in self.segmenter.mask_cache:
+                    continue
+                # A failing prefetch must not end the worker, the next request still has to be served
+                try:
+                    with self.model_lock:
+                        if not self._is_current(generation) or self.segmenter.video_frames is None:
+                            break
+                        self.segmenter.segment_frame(idx)
+                except Exception as e:
+                    print(f"Prefetching frame {idx} failed: {e}")
+                    continue
+                self.prefetched += 1
+
+    # Function to list the frames to prefetch around frame_idx, most likely next frames first
+    def _prefetch_order(self, frame_idx, direction, stride):
+        frames = self.segmenter.video_frames
+        num_frames = len(frames) if frames is not None else 0
+        ahead = [frame_idx + direction * stride * k for k in range(1, self.ahead + 1)]
+        behind = [frame_idx - direction * k for k in range(1, self.behind + 1)]
+
+        # Interleave so the first frames on both sides come before far-ahead ones
+        order = ahead[:2] + behind[:1] + ahead[2:] + behind[1:]
+        return [idx for idx in order if 0 <= idx < num_frames]
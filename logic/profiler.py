@@ -0,0 +1,190 @@
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+import numpy as np
+
+# Per-stage timing of the segmentation pipeline (decode, resize, session setup, model step,
+# post-processing, host copy, overlay, export, ...). Disabled profilers cost one attribute check
+# per stage. Enabled with SQUIRREL_PROFILE=1, Profiler(enabled=True) or batch.py --profile.
+# snapshot() can be polled from other threads (the GUI) while a run is in progress.
+
+PROFILE_ENV = "SQUIRREL_PROFILE"
+_NULL_STAGE = nullcontext()
+
+
+# Function to get the peak resident memory of this process in MB (None where not available)
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+# Function to get allocated and peak torch CUDA memory in MB (None without torch or a GPU);
+# torch is not imported here, only used if the pipeline already loaded it
+def torch_memory_mb():
+    torch = sys.modules.get("torch")
+    if torch is None or not torch.cuda.is_available():
+        return None
+    return {
+        "allocated_mb": torch.cuda.memory_allocated() / 1024**2,
+        "peak_allocated_mb": torch.cuda.max_memory_allocated() / 1024**2,
+        "peak_reserved_mb": torch.cuda.max_memory_reserved() / 1024**2,
+    }
+
+
+class Profiler:
+    def __init__(self, enabled=None, max_samples=100000):
+        if enabled is None:
+            enabled = os.getenv(PROFILE_ENV, "") not in ("", "0")
+        self.enabled = enabled
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self.reset()
+
+    # Function to clear all measurements
+    def reset(self):
+        with self._lock:
+            self._samples = {}
+            self._totals = {}
+            self._counts = {}
+            self.frames = 0
+            self.run_name = None
+            self.run_start = None
+            self.run_end = None
+
+    # Context manager measuring one execution of a stage
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_STAGE
+        return self._measure(name)
+
+    @contextmanager
+    def _measure(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    # Function to add one measurement in seconds (e.g. from a timer of another class)
+    def record(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            if name not in self._samples:
+                # Percentiles use the latest max_samples measurements, totals all of them
+                self._samples[name] = deque(maxlen=self.max_samples)
+                self._totals[name] = 0.0
+                self._counts[name] = 0
+            self._samples[name].append(seconds)
+            self._totals[name] += seconds
+            self._counts[name] += 1
+
+    # Generator timing how long every next() of iterable takes (e.g. the model step of the
+    # propagation iterator); the time is recorded for the thread that consumes the iterator
+    def iterate(self, name, iterable):
+        if not self.enabled:
+            yield from iterable
+            return
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.record(name, time.perf_counter() - start)
+            yield item
+
+    # Function to start a run (e.g. one propagation); frames/sec refer to the current run
+    def begin_run(self, name):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.run_name = name
+            self.run_start = time.perf_counter()
+            self.run_end = None
+            self.frames = 0
+
+    def end_run(self):
+        if self.enabled and self.run_start is not None:
+            self.run_end = time.perf_counter()
+
+    # Function to count finished frames of the current run
+    def add_frames(self, n=1):
+        if self.enabled:
+            with self._lock:
+                self.frames += n
+
+    # Function to get all measurements as a dict (times in ms); safe to call while a run is in progress
+    def snapshot(self):
+        with self._lock:
+            samples = {name: np.fromiter(values, dtype=np.float64) for name, values in self._samples.items()}
+            totals = dict(self._totals)
+            counts = dict(self._counts)
+            frames = self.frames
+            run_name, run_start, run_end = self.run_name, self.run_start, self.run_end
+
+        stages = {}
+        for name, values in samples.items():
+            stages[name] = {
+                "count": counts[name],
+                "total_s": totals[name],
+                "mean_ms": totals[name] / counts[name] * 1000,
+                "p50_ms": float(np.percentile(values, 50)) * 1000,
+                "p95_ms": float(np.percentile(values, 95)) * 1000,
+                "max_ms": float(values.max()) * 1000,
+            }
+        elapsed = ((run_end or time.perf_counter()) - run_start) if run_start is not None else 0.0
+        return {
+            "enabled": self.enabled,
+            "run": run_name,
+            "running": run_start is not None and run_end is None,
+            "frames": frames,
+            "elapsed_s": elapsed,
+            "fps": frames / elapsed if elapsed > 0 else 0.0,
+            "peak_rss_mb": peak_rss_mb(),
+            "torch_memory": torch_memory_mb(),
+            "stages": stages,
+        }
+
+    # Function to write the snapshot as JSON
+    def write_json(self, output_path):
+        with open(output_path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    # Function to write the per-stage table as CSV (one row per stage)
+    def write_csv(self, output_path):
+        snapshot = self.snapshot()
+        columns = ["count", "total_s", "mean_ms", "p50_ms", "p95_ms", "max_ms"]
+        with open(output_path, mode="w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["stage", *columns])
+            for name, row in snapshot["stages"].items():
+                writer.writerow([name, *(round(row[column], 4) for column in columns)])
+
+    # Function to format the per-stage table for the console
+    def format_table(self):
+        snapshot = self.snapshot()
+        lines = [f"{'stage':<24} {'count':>7} {'total s':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}"]
+        for name, row in sorted(snapshot["stages"].items(), key=lambda item: -item[1]["total_s"]):
+            lines.append(
+                f"{name:<24} {row['count']:>7} {row['total_s']:>8.2f} {row['p50_ms']:>8.1f} "
+                f"{row['p95_ms']:>8.1f} {row['max_ms']:>8.1f}"
+            )
+        summary = f"{snapshot['frames']} frames, {snapshot['fps']:.1f} fps"
+        if snapshot["peak_rss_mb"] is not None:
+            summary += f", peak RSS {snapshot['peak_rss_mb']:.0f} MB"
+        if snapshot["torch_memory"] is not None:
+            summary += f", peak CUDA {snapshot['torch_memory']['peak_allocated_mb']:.0f} MB"
+        lines.append(summary)
+        return "\n".join(lines)
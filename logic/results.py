@@ -0,0 +1,246 @@
+import numpy as np
+
+# Bits of the per-frame flags column
+FLAG_DETECTED = 1
+FLAG_INTERPOLATED = 2  # filled in between keyframes, not run through the model
+FLAG_GATED = 4  # skipped by the motion gate, no model call
+
+# Column layout of the result store (name -> dtype)
+COLUMNS = {
+    "frame_idx": np.int32,
+    "w": np.int32,
+    "h": np.int32,
+    "x1": np.int32,
+    "y1": np.int32,
+    "x2": np.int32,
+    "y2": np.int32,
+    "area": np.int64,
+    "flags": np.uint8,
+}
+
+
+# Columnar store for the per-frame propagation results.
+# Every column is a preallocated NumPy array (37 bytes per frame in total), frames without a mask
+# have area 0, bbox -1 and the detected flag cleared. Columns are read as views, e.g. results["area"].
+class SegmentationResults:
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.columns = {name: np.zeros(max(capacity, 1), dtype=dtype) for name, dtype in COLUMNS.items()}
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, name):
+        return self.columns[name][:self.size]
+
+    @property
+    def detected(self):
+        return (self["flags"] & FLAG_DETECTED) != 0
+
+    @property
+    def interpolated(self):
+        return (self["flags"] & FLAG_INTERPOLATED) != 0
+
+    @property
+    def gated(self):
+        return (self["flags"] & FLAG_GATED) != 0
+
+    @property
+    def nbytes(self):
+        return sum(column[:self.size].nbytes for column in self.columns.values())
+
+    # Function to add the result of one frame, bbox is (x_min, y_min, x_max, y_max) or None
+    def append(self, frame_idx, w, h, area, bbox, flags=0):
+        if self.size == len(self.columns["frame_idx"]):
+            self._grow()
+        i = self.size
+        c = self.columns
+        c["frame_idx"][i] = frame_idx
+        c["w"][i] = w
+        c["h"][i] = h
+        c["area"][i] = area
+        if bbox is not None:
+            c["x1"][i], c["y1"][i], c["x2"][i], c["y2"][i] = bbox
+            flags |= FLAG_DETECTED
+        else:
+            c["x1"][i] = c["y1"][i] = c["x2"][i] = c["y2"][i] = -1
+        c["flags"][i] = flags
+        self.size += 1
+
+    def _grow(self):
+        for name, column in self.columns.items():
+            grown = np.zeros(len(column) * 2, dtype=column.dtype)
+            grown[:len(column)] = column
+            self.columns[name] = grown
+
+    # Function to get one frame in the layout of the former mask_data_storage dicts
+    def row(self, i):
+        c = self.columns
+        detected = c["flags"][i] & FLAG_DETECTED
+        bbox = [int(c[k][i]) if detected else "" for k in ("x1", "y1", "x2", "y2")]
+        return {"idx": int(c["frame_idx"][i]), "w": int(c["w"][i]), "h": int(c["h"][i]),
+                "x1": bbox[0], "y1": bbox[1], "x2": bbox[2], "y2": bbox[3]}
+
+    # Function to write frame index and mask area as CSV (same format as csv.writer)
+    def write_area_csv(self, output_path):
+        values = np.column_stack([self["frame_idx"], self["area"]]).ravel()
+        with open(output_path, mode="w", newline="") as f:
+            f.write("Frame,Masked_Pixels\r\n")
+            f.write(("%d,%d\r\n" * self.size) % tuple(values.tolist()))
+
+    # Function to write frame size and bbox as CSV; frames without a mask get empty bbox fields
+    def write_bbox_csv(self, output_path):
+        keys = ("frame_idx", "w", "h", "x1", "y1", "x2", "y2")
+        table = np.column_stack([self[k] for k in keys])
+        detected = self.detected
+
+        # One format template per row, undetected rows only consume the first three values
+        template = "".join(np.where(detected, "%d,%d,%d,%d,%d,%d,%d\r\n", "%d,%d,%d,,,,\r\n").tolist())
+        keep = np.ones(table.shape, dtype=bool)
+        keep[~detected, 3:] = False
+
+        with open(output_path, mode="w", newline="") as f:
+            f.write("frame_idx,width,height,x_min,y_min,x_max,y_max\r\n")
+            f.write(template % tuple(table[keep].tolist()))
+
+    # Function to save all columns in a compact binary file (.npz), optionally with the object table
+    def save(self, output_path, objects=None):
+        arrays = {name: self[name] for name in COLUMNS}
+        if objects is not None:
+            arrays.update({f"object_{name}": objects[name] for name in OBJECT_COLUMNS})
+            arrays["object_prompts"] = np.array(objects.prompts, dtype=str)
+        np.savez(output_path, **arrays)
+
+    # Function to get copies of all columns, e.g. to send them to another process
+    def to_columns(self):
+        return {name: self[name].copy() for name in COLUMNS}
+
+    # Function to build a store from a dict of equally long columns
+    @classmethod
+    def from_columns(cls, columns):
+        size = len(columns["frame_idx"])
+        results = cls(size)
+        for name, dtype in COLUMNS.items():
+            results.columns[name][:size] = np.asarray(columns[name], dtype=dtype)
+        results.size = size
+        return results
+
+    # Function to get a new store with the given rows (index array or boolean mask)
+    def select(self, rows):
+        return SegmentationResults.from_columns({name: self[name][rows] for name in COLUMNS})
+
+    # Function to join several stores (e.g. temporal segments) in the given order
+    @classmethod
+    def concat(cls, parts):
+        return cls.from_columns({name: np.concatenate([part[name] for part in parts]) for name in COLUMNS})
+
+    # Function to load results saved with save()
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls.from_columns({name: data[name] for name in COLUMNS})
+
+
+# Column layout of the per-object result store; prompt is the index into the list of text prompts
+# (-1 if the model did not report which prompt found the object)
+OBJECT_COLUMNS = {
+    "frame_idx": np.int32,
+    "object_id": np.int32,
+    "prompt": np.int16,
+    "area": np.int64,
+    "x1": np.int32,
+    "y1": np.int32,
+    "x2": np.int32,
+    "y2": np.int32,
+}
+
+
+# Columnar store with one row per tracked object and frame (only frames run through the model).
+# The per-frame SegmentationResults hold the union of all objects of a frame.
+class ObjectResults:
+    def __init__(self, capacity=1024, prompts=()):
+        self.size = 0
+        self.prompts = list(prompts)
+        self.columns = {name: np.zeros(max(capacity, 1), dtype=dtype) for name, dtype in OBJECT_COLUMNS.items()}
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, name):
+        return self.columns[name][:self.size]
+
+    # Function to add one object of one frame, bbox is (x_min, y_min, x_max, y_max)
+    def append(self, frame_idx, object_id, prompt, area, bbox):
+        if self.size == len(self.columns["frame_idx"]):
+            for name, column in self.columns.items():
+                grown = np.zeros(len(column) * 2, dtype=column.dtype)
+                grown[:len(column)] = column
+                self.columns[name] = grown
+        i = self.size
+        c = self.columns
+        c["frame_idx"][i] = frame_idx
+        c["object_id"][i] = object_id
+        c["prompt"][i] = prompt
+        c["area"][i] = area
+        c["x1"][i], c["y1"][i], c["x2"][i], c["y2"][i] = bbox
+        self.size += 1
+
+    # Function to get the text of a prompt index ("" if unknown)
+    def prompt_text(self, prompt):
+        return self.prompts[prompt] if 0 <= prompt < len(self.prompts) else ""
+
+    # Function to get the total mask area per object id as {object_id: area}
+    def area_per_object(self):
+        ids, inverse = np.unique(self["object_id"], return_inverse=True)
+        return dict(zip(ids.tolist(), np.bincount(inverse, weights=self["area"]).astype(np.int64).tolist()))
+
+    # Function to write one row per object and frame as CSV
+    def write_csv(self, output_path):
+        with open(output_path, mode="w", newline="") as f:
+            f.write("frame_idx,object_id,prompt,area,x_min,y_min,x_max,y_max\r\n")
+            rows = zip(*(self[name].tolist() for name in OBJECT_COLUMNS))
+            f.writelines(
+                f"{frame_idx},{object_id},{self.prompt_text(prompt)},{area},{x1},{y1},{x2},{y2}\r\n"
+                for frame_idx, object_id, prompt, area, x1, y1, x2, y2 in rows
+            )
+
+    # Function to get copies of all columns
+    def to_columns(self):
+        return {name: self[name].copy() for name in OBJECT_COLUMNS}
+
+    # Function to build a store from a dict of equally long columns
+    @classmethod
+    def from_columns(cls, columns, prompts=()):
+        size = len(columns["frame_idx"])
+        results = cls(size, prompts)
+        for name, dtype in OBJECT_COLUMNS.items():
+            results.columns[name][:size] = np.asarray(columns[name], dtype=dtype)
+        results.size = size
+        return results
+
+    # Function to load the objects saved with SegmentationResults.save(..., objects=...)
+    # (None if the file has no object table)
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if "object_frame_idx" not in data:
+                return None
+            prompts = data["object_prompts"].tolist() if "object_prompts" in data else []
+            return cls.from_columns({name: data[f"object_{name}"] for name in OBJECT_COLUMNS}, prompts)
+
+
+# Function to get the bbox IoU of two result stores row by row (two empty frames count as a match)
+def bbox_iou(a, b):
+    box_a = np.column_stack([a["x1"], a["y1"], a["x2"], a["y2"]]).astype(np.float64)
+    box_b = np.column_stack([b["x1"], b["y1"], b["x2"], b["y2"]]).astype(np.float64)
+    w = np.minimum(box_a[:, 2], box_b[:, 2]) - np.maximum(box_a[:, 0], box_b[:, 0]) + 1
+    h = np.minimum(box_a[:, 3], box_b[:, 3]) - np.maximum(box_a[:, 1], box_b[:, 1]) + 1
+    inter = np.clip(w, 0, None) * np.clip(h, 0, None)
+    area_a = (box_a[:, 2] - box_a[:, 0] + 1) * (box_a[:, 3] - box_a[:, 1] + 1)
+    area_b = (box_b[:, 2] - box_b[:, 0] + 1) * (box_b[:, 3] - box_b[:, 1] + 1)
+    union = area_a + area_b - inter
+
+    detected_a, detected_b = a.detected, b.detected
+    iou = np.where(detected_a & detected_b, inter / np.maximum(union, 1), 0.0)
+    iou[~detected_a & ~detected_b] = 1.0
+    return iou
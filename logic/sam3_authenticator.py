@@ -1,22 +1,46 @@
+import hashlib
+import json
 import os
+import time
 from dotenv import load_dotenv
-from huggingface_hub import login, whoami
+
+# Successful logins are remembered per token (only its hash is stored), so startup does not need a
+# network round trip and the app also starts offline with a token that was valid before
+AUTH_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "squirrel_detector", "auth.json")
 
 class SAM3Auth:
-    def __init__(self):
+    def __init__(self, cache_path=AUTH_CACHE_PATH, max_age_days=7):
         # Load .env file
         load_dotenv()
+        self.cache_path = cache_path
+        self.max_age = max_age_days * 24 * 3600
 
     def login(self, token=None):
-        # Check if already authenticated 
+        # huggingface_hub is only imported when a login is actually needed
+        from huggingface_hub import get_token, login, whoami
+
+        tk = token or os.getenv("HF_TOKEN") or get_token()
+        cached = self._read_cache(tk)
+        if cached and time.time() - cached["time"] < self.max_age:
+            self._use_token(tk)
+            print(f"Authenticated as: {cached['name']} (cached)")
+            return True
+
+        # Check if already authenticated
         try:
-            user = whoami()
+            user = whoami(token=tk)
+            self._use_token(tk)
+            self._write_cache(tk, user["name"])
             print(f"Authenticated as: {user['name']}")
             return True
-        except Exception:
-            # Not authenticated,  check for token
-            tk = token or os.getenv("HF_TOKEN")
-            
+        except Exception as e:
+            # No connection: a token that was valid before is good enough
+            if cached:
+                self._use_token(tk)
+                print(f"Hugging Face not reachable ({type(e).__name__}), using cached login of {cached['name']}.")
+                return True
+
+            # Not authenticated, check for token
             if tk:
                 try:
                     login(token=tk)
@@ -24,8 +48,35 @@ class SAM3Auth:
                     return True
                 except Exception as e:
                     print(f"Login failed: {e}")
-            
+
             print("Error: No valid session or token found.")
             return False
 
-SAM3Auth().login()
\ No newline at end of file
+    # Token passed explicitly: make it visible to huggingface_hub downloads in this process
+    def _use_token(self, token):
+        if token and not os.getenv("HF_TOKEN"):
+            os.environ["HF_TOKEN"] = token
+
+    def _token_hash(self, token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _read_cache(self, token):
+        if not token:
+            return None
+        try:
+            with open(self.cache_path) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return None
+        entry = cache.get(self._token_hash(token))
+        return entry if isinstance(entry, dict) and "time" in entry else None
+
+    def _write_cache(self, token, name):
+        if not token:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(self.cache_path, "w") as f:
+                json.dump({self._token_hash(token): {"name": name, "time": time.time()}}, f)
+        except OSError as e:
+            print(f"Could not cache login: {e}")
@@ -1,87 +1,340 @@
 import base64
 import io
-import csv
+import os
 import numpy as np
 import torch
-from transformers import Sam3VideoModel, Sam3VideoProcessor
-from accelerate import Accelerator
 import cv2 as cv
 import time
-from transformers.video_utils import load_video
-import matplotlib
-matplotlib.use('Agg') 
-import matplotlib.pyplot as plt
-import matplotlib.ticker as ticker
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from logic.video_stream import probe_video
+from logic.frame_store import FrameCache, load_frames, remove_spill_dir
+from logic.session_frames import SessionFrames
+from logic.mask_stats import MaskStatsBatcher
+from logic.pipeline import ordered_pipeline
+from logic.sinks import FrameResult
+from logic.results import SegmentationResults, ObjectResults, FLAG_GATED
+from logic.mask_cache import MaskCache
+from logic.inference_backend import resolve_device, resolve_precision, set_num_threads, prepare_model
+from logic.keyframes import select_keyframes, KeyframeFiller
+from logic.motion_gate import MotionGate
+from logic.chart import minmax_decimate
+from logic.overlay import OverlayRenderer
+from logic.mask_archive import MaskArchive
+from logic.video_export import AsyncVideoWriter
+from logic.profiler import Profiler
+from logic.stub_model import STUB_MODEL_ID
 
 # Class to handle all SAM3 video segmentation logic
 class Sam3VideoSegmenter:
     # Initialize the segmenter with model loading and processing device
-    def __init__(self, model_id="facebook/sam3", target_size=512):
-        if not torch.cuda.is_available():
-            print("IMPORTANT: GPU not detected in this environment!")
-            print("SAM 3 will be extremely slow or stuck on CPU and GUI can crash!!!!")
-            
-        self.device = Accelerator().device
+    # (an already loaded model and processor can be passed in instead; model_id="stub" uses the offline
+    # stub of logic/stub_model.py)
+    # mask_cache_mb is the memory budget of the single-frame mask cache.
+    # precision is "auto", "float32", "bfloat16", "float16" or "int8" (CPU only), compile_model runs
+    # the model through torch.compile and num_threads sets the CPU threads (see logic/inference_backend.py).
+    # With load_async the model loads on a background thread and load_video waits for it;
+    # progress_callback(percent, text) reports the loading stages.
+    # profiler collects per-stage timings (see logic/profiler.py); by default it is enabled with SQUIRREL_PROFILE=1.
+    def __init__(self, model_id="facebook/sam3", target_size=512, model=None, processor=None, mask_cache_mb=256,
+                 device=None, precision="auto", compile_model=False, num_threads=None,
+                 load_async=False, progress_callback=None, profiler=None):
+        self.device = resolve_device(device)
+        self.precision, self.DTYPE = resolve_precision(precision, self.device)
+        self.DEVICE = self.device.type
         self.MODEL_ID = model_id
-        self.DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
-        self.DTYPE = torch.bfloat16
         self.TARGET_SIZE = target_size
+        self.profiler = profiler or Profiler()
+
+        threads = set_num_threads(num_threads)
+        if self.device.type == "cpu":
+            print(f"Running on the CPU ({self.precision}, {threads} threads). A GPU is much faster for SAM 3.")
+        else:
+            print(f"Running on {self.device} ({self.precision}). Supported Architectures: {torch.cuda.get_arch_list()}")
 
-        print(f"Supported Architectures: {torch.cuda.get_arch_list()}")
         # Load model
-        self.model = Sam3VideoModel.from_pretrained(self.MODEL_ID).to(
-            self.DEVICE, dtype=self.DTYPE
-        ).eval()
-        self.processor = Sam3VideoProcessor.from_pretrained(self.MODEL_ID)
-        print("Successfully loaded model.")
-        
+        self.model = model
+        self.processor = processor
+        self.model_ready = threading.Event()
+        self._load_error = None
+        self._progress_callback = progress_callback
+        if load_async:
+            threading.Thread(target=self._load_model, args=(compile_model,), daemon=True).start()
+        else:
+            self._load_model(compile_model)
+            self.wait_until_ready()
+
         self.video_frames = None
         self.video_frames_original_size = None
         self.inference_session = None
-        self.mask_areas = []
+        self.session_frame_indices = None
+        self.frame_range = None
+        self.keyframe_fill = None
+        self.motion_gate = None
+        self.gated_frames = None
+        self.spill_dir = None
+        self.video_info = None
+        self.video_path = None
+        self.video_fps = 30
+        # Masks of a previous run, opened with load_mask_archive (used instead of the model)
+        self.mask_archive = None
+        self.frame_cache = FrameCache()
+        self.results = SegmentationResults()
+        # Per-object areas and bboxes of the last propagation (all prompts, every tracked object id)
+        self.object_results = ObjectResults()
+        self.prompts = []
+        self.prompt = None
+        self.mask_cache = MaskCache(max_bytes=mask_cache_mb * 1024**2)
+        # Draws the low-res masks onto frames of any size, only inside the bbox of the mask
+        self.overlay_renderer = OverlayRenderer(color=(0, 255, 0), alpha=0.5)
+        self.processed_frames = []
     
+    # Function to load processor and model (if they were not passed in); transformers is imported here,
+    # so importing this module stays cheap
+    def _load_model(self, compile_model=False):
+        try:
+            # Offline stand-in for benchmarks and development without the gated weights
+            if self.MODEL_ID == STUB_MODEL_ID and (self.model is None or self.processor is None):
+                from logic.stub_model import create_stub
+                stub_model, stub_processor = create_stub()
+                self.model = self.model or stub_model
+                self.processor = self.processor or stub_processor
+            if self.processor is None or self.model is None:
+                self._report_progress(5, "Importing transformers...")
+                from transformers import Sam3VideoModel, Sam3VideoProcessor
+            if self.processor is None:
+                self._report_progress(20, "Loading processor...")
+                self.processor = Sam3VideoProcessor.from_pretrained(self.MODEL_ID)
+            if self.model is None:
+                self._report_progress(30, "Loading model weights...")
+                model = Sam3VideoModel.from_pretrained(self.MODEL_ID)
+                self._report_progress(80, f"Preparing model ({self.precision} on {self.device})...")
+                self.model = prepare_model(model, self.device, self.precision, compile_model)
+            self._report_progress(100, "Model ready.")
+            print("Successfully loaded model.")
+        except Exception as e:
+            self._load_error = e
+            self._report_progress(100, f"Loading the model failed: {e}")
+        finally:
+            self.model_ready.set()
+
+    def _report_progress(self, percent, text):
+        if self._progress_callback:
+            self._progress_callback(percent, text)
+
+    # Function to block until the model is loaded; raises the error if loading failed
+    def wait_until_ready(self, timeout=None):
+        if not self.model_ready.wait(timeout):
+            raise TimeoutError("The model is still loading.")
+        if self._load_error is not None:
+            raise RuntimeError(f"Loading the model failed: {self._load_error}") from self._load_error
+
+    # Mask area per frame (view into the result store)
+    @property
+    def mask_areas(self):
+        return self.results["area"]
+
+    # Per-frame frame size and bbox, columnar (see logic/results.py)
+    @property
+    def mask_data_storage(self):
+        return self.results
+
     # Funtion to load video 
-    def load_video(self, video_path):
-        # load video frames and store original and resized
-        self.video_frames_original_size, _ = load_video(video_path)
-        video_frames, _ = load_video(video_path)
-        resized_frames = []
-        
-        # Resize frames 
-        for frame in video_frames:
-            h, w = frame.shape[:2]
-            scale = self.TARGET_SIZE / max(h, w)
-            new_w = int(w * scale)
-            new_h = int(h * scale)
-            resized = cv.resize(frame, (new_w, new_h), interpolation=cv.INTER_AREA)
-            resized_frames.append(resized)
-
-        self.video_frames = resized_frames
-
-        # Initialize sam3 inference session with video frames
-        self.inference_session = self.processor.init_video_session(
-            video=self.video_frames,
-            inference_device=self.device,
-            dtype=torch.bfloat16,
+    # With init_session=False only the frames are loaded and the model is not needed (see load_mask_archive).
+    def load_video(self, video_path, chunk_size=64, use_cache=True, resize_backend="opencv", init_session=True):
+        self.release_video()
+        self.video_info = probe_video(video_path)
+        self.video_path = os.path.abspath(video_path)
+        self.video_fps = self.video_info["fps"]
+
+        with self.profiler.stage("load_video"):
+            self.video_frames_original_size, self.video_frames, self.spill_dir = load_frames(
+                video_path,
+                self.TARGET_SIZE,
+                frame_cache=self.frame_cache if use_cache else None,
+                chunk_size=chunk_size,
+                resize_backend=resize_backend,
+                profiler=self.profiler,
+            )
+        if not init_session:
+            self.frame_range = (0, len(self.video_frames))
+            print(f"Loaded {len(self.video_frames)} frames without a model session.")
+            return
+        # Frames are decoded while the model may still be loading; the session needs the processor
+        with self.profiler.stage("load.wait_for_model"):
+            self.wait_until_ready()
+        self.set_frame_range(0, len(self.video_frames))
+        print(f"Loaded {len(self.video_frames)} frames ({self.video_frames.shape[2]}x{self.video_frames.shape[1]} for inference).")
+
+    # Function to (re)create the sam3 inference session over the given frame indices.
+    # Model frame indices inside the session are mapped back to video frame indices via session_frame_indices.
+    def _init_session(self, frame_indices):
+        self.session_frame_indices = np.asarray(frame_indices, dtype=np.int64)
+
+        # Initialize sam3 inference session in streaming mode; frames are preprocessed lazily
+        # by SessionFrames when the model first asks for them
+        with self.profiler.stage("init_session"):
+            self.inference_session = self.processor.init_video_session(
+                inference_device=self.device,
+                dtype=self.DTYPE,
+            )
+        _, h, w, _ = self.video_frames.shape
+        self.inference_session.video_height = h
+        self.inference_session.video_width = w
+        self.inference_session.processed_frames = SessionFrames(
+            self.video_frames,
+            self.processor.video_processor,
+            device=self.device,
+            dtype=self.DTYPE,
+            indices=self.session_frame_indices,
+            profiler=self.profiler,
         )
-
-        print(type(self.video_frames))
-        print(type(self.inference_session))
-
-    # Function to add text prompt to sam3 session
+        if self.prompts:
+            self.processor.add_text_prompt(inference_session=self.inference_session, text=self._prompt_text())
+
+    # Function to restrict the session to the frames [start, end), e.g. for one temporal segment of a long video.
+    # Resets keyframe mode and motion gate.
+    def set_frame_range(self, start, end):
+        end = min(end, len(self.video_frames))
+        self.frame_range = (start, end)
+        self.keyframe_fill = None
+        self.motion_gate = None
+        self.gated_frames = None
+        self._init_session(np.arange(start, end))
+
+    # Function to run the model only on keyframes of the current frame range: every step-th frame and/or
+    # frames where more than diff_threshold of the pixels changed since the last keyframe (see logic/keyframes.py).
+    # propagate_video fills the skipped frames by "interpolate" or "carry" and flags them as interpolated.
+    def set_keyframes(self, step=None, diff_threshold=None, fill="interpolate", pixel_threshold=20):
+        start, end = self.frame_range
+        keyframes = select_keyframes(self.video_frames, start, end, step=step, diff_threshold=diff_threshold,
+                                     pixel_threshold=pixel_threshold)
+        if self.gated_frames is not None:
+            keyframes = keyframes[~self.gated_frames[keyframes]]
+        self._init_session(keyframes)
+        self.keyframe_fill = fill
+        print(f"Keyframe mode: {len(keyframes)} of {end - start} frames go through the model.")
+
+    # Function to enable the motion gate for the current frame range: static frames are removed from the
+    # session and get zero area and no bbox without a model call (see logic/motion_gate.py).
+    # Counters for tuning the thresholds are kept on self.motion_gate.
+    def set_motion_gate(self, **gate_options):
+        start, end = self.frame_range
+        self.motion_gate = MotionGate(**gate_options)
+        motion = self.motion_gate.analyze(self.video_frames, start, end)
+        self.gated_frames = np.zeros(len(self.video_frames), dtype=bool)
+        self.gated_frames[start:end] = ~motion
+
+        self._init_session(self.session_frame_indices[~self.gated_frames[self.session_frame_indices]])
+        print(f"Motion gate: {self.motion_gate.frames_gated} of {end - start} frames are static and skipped.")
+
+    # Function to map a video frame index to the model frame index of the current session
+    def _session_index(self, frame_idx):
+        pos = int(np.searchsorted(self.session_frame_indices, frame_idx))
+        if pos == len(self.session_frame_indices) or self.session_frame_indices[pos] != frame_idx:
+            raise IndexError(f"Frame {frame_idx} is not part of the current session.")
+        return pos
+
+    # Function to get the session frame nearest to frame_idx (the earlier one on ties, as KeyframeFiller)
+    def _nearest_session_frame(self, frame_idx):
+        indices = self.session_frame_indices
+        pos = int(np.searchsorted(indices, frame_idx))
+        if pos == len(indices) or (pos > 0 and frame_idx - indices[pos - 1] <= indices[pos] - frame_idx):
+            pos -= 1
+        return int(indices[pos])
+
+    # Function to drop the frames of the previous video; spilled (uncached) frames are deleted
+    def release_video(self):
+        for store in (self.video_frames, self.video_frames_original_size):
+            if store is not None:
+                store.close()
+        remove_spill_dir(self.spill_dir)
+        if self.mask_archive is not None:
+            self.mask_archive.close()
+        self.mask_archive = None
+        self.video_path = None
+        self.video_frames = None
+        self.video_frames_original_size = None
+        self.inference_session = None
+        self.session_frame_indices = None
+        self.frame_range = None
+        self.keyframe_fill = None
+        self.motion_gate = None
+        self.gated_frames = None
+        self.spill_dir = None
+        self.prompts = []
+        self.prompt = None
+        self.mask_cache.clear()
+
+    # Function to add text prompt to sam3 session.
+    # text_prompt is one prompt or a list of prompts (e.g. ["Squirrel", "Bird"]); all prompts are tracked
+    # in the same session, so one propagation pass covers every prompt and every object it finds.
     def add_text_prompt(self, text_prompt):
+        prompts = [text_prompt] if isinstance(text_prompt, str) else list(text_prompt)
+        if not prompts:
+            raise ValueError("At least one text prompt is needed.")
+        self.prompts = prompts
         self.processor.add_text_prompt(
             inference_session=self.inference_session,
-            text=text_prompt,
+            text=self._prompt_text(),
         )
+        # Key of the mask cache
+        self.prompt = prompts[0] if len(prompts) == 1 else tuple(prompts)
+        self.mask_cache.clear()
+
+    # Function to get the prompts in the form the processor takes them (a string for a single prompt)
+    def _prompt_text(self):
+        return self.prompts[0] if len(self.prompts) == 1 else list(self.prompts)
+
+    # Function to get the object ids of the processed outputs and the index of the prompt that found each
+    # object (-1 if the processor does not report it)
+    def _object_prompts(self, processed_outputs, num_objects):
+        object_ids = processed_outputs.get("object_ids")
+        object_ids = [int(i) for i in object_ids] if object_ids is not None else list(range(num_objects))
+        if len(self.prompts) == 1:
+            return object_ids, [0] * num_objects
+
+        prompt_of = {}
+        for prompt, ids in (processed_outputs.get("prompt_to_obj_ids") or {}).items():
+            index = self.prompts.index(prompt) if prompt in self.prompts else -1
+            for object_id in ids:
+                prompt_of[int(object_id)] = index
+        return object_ids, [prompt_of.get(object_id, -1) for object_id in object_ids]
+
+    # Function to get the frame mask as the union of all object masks (None if nothing was detected)
+    @staticmethod
+    def _union_mask(masks):
+        if masks.numel() == 0:
+            return None
+        return masks[0] if len(masks) == 1 else masks.any(dim=0)
+
+    # Function to get the mask of a single frame at inference resolution (bool array, None if nothing
+    # was detected). Results are kept in the LRU mask cache, so revisiting a frame skips the model.
+    # After load_mask_archive the masks come from the archive.
+    def segment_frame(self, frame_idx):
+        if self.mask_archive is not None:
+            return self.mask_archive.get(frame_idx) if frame_idx in self.mask_archive else None
+        hit, mask = self.mask_cache.get(frame_idx, self.prompt)
+        if hit:
+            return mask
+
+        # Static frames of the motion gate are empty without asking the model
+        if self.gated_frames is not None and self.gated_frames[frame_idx]:
+            self.motion_gate.model_calls_skipped += 1
+            return None
 
-    # Function to process a single frame
-    def showSingleFrame(self, frame_idx, return_frame_only=False):
-        with torch.no_grad():
+        # In keyframe mode frames between keyframes show the mask of the nearest keyframe
+        if self.keyframe_fill is not None and len(self.session_frame_indices) > 0:
+            nearest = self._nearest_session_frame(frame_idx)
+            if nearest != frame_idx:
+                return self.segment_frame(nearest)
+
+        with torch.no_grad(), self.profiler.stage("single_frame.model"):
             # Run inference for the specified frame index
             model_outputs = self.model(
                 inference_session=self.inference_session,
-                frame_idx=frame_idx,
+                frame_idx=self._session_index(frame_idx),
             )
 
             # Postprocess outputs to get masks
@@ -90,122 +343,213 @@ class Sam3VideoSegmenter:
                 model_outputs
             )
 
-            # Store the processed outputs for this frame
-            frame_output = processed_outputs
-            
-            # Get the original size frame for display
-            frame = self.video_frames_original_size[frame_idx].copy()
-            h, w = frame.shape[:2]
+        mask = self._union_mask(processed_outputs["masks"])
+        mask = mask.detach().cpu().numpy().astype(bool) if mask is not None else None
+        self.mask_cache.put(frame_idx, self.prompt, mask)
+        return mask
 
-            # Check if any masks were detected and create overlay
-            if len(frame_output["masks"]) > 0:
-                raw_mask = frame_output["masks"][0].detach().cpu().numpy().astype("uint8") * 255
-                
-                mask_resized = cv.resize(raw_mask, (w, h), interpolation=cv.INTER_NEAREST)
-                
-                frame[mask_resized == 255] = [0, 255, 0]  
-            else:
-                print(f"No masks detected for frame {frame_idx}")
-            
-            # Return frame if requested; otherwise show the frame with cv2
-            frame_rgb = cv.cvtColor(frame, cv.COLOR_BGR2RGB)
-            if return_frame_only:
-                return frame_rgb
-
-            cv.imshow("High Res Mask", frame_rgb)
-            cv.waitKey(0)
-            cv.destroyAllWindows()
+    # Function to process a single frame
+    def showSingleFrame(self, frame_idx, return_frame_only=False, out=None):
+        with self.profiler.stage("single_frame.segment"):
+            mask = self.segment_frame(frame_idx)
+
+        # The original size frame is resized straight into the display buffer (out, e.g. from
+        # logic/frame_buffer.py) or copied once; frames are RGB, so no colour conversion is needed.
+        # The mask is drawn as a solid fill, only the bbox of the mask is touched.
+        source = self.video_frames_original_size[frame_idx]
+        with self.profiler.stage("single_frame.render"):
+            out = self.overlay_renderer.render(source, mask, out=out, alpha=1.0)
+        if mask is None:
+            print(f"No masks detected for frame {frame_idx}")
+        
+        # Return frame (RGB) if requested; otherwise show the frame with cv2
+        if return_frame_only:
+            return out
+
+        cv.imshow("High Res Mask", cv.cvtColor(out, cv.COLOR_RGB2BGR))
+        cv.waitKey(0)
+        cv.destroyAllWindows()
     
     # Function to run sam3 propagation across the entire video 
-    def propagate_video(self, show_live=False, status_callback=None):
+    # Frame results can additionally be streamed to sinks (see logic/sinks.py) while propagation runs;
+    # with keep_frames=False the overlaid frames are not collected in memory at all.
+    def propagate_video(self, show_live=False, status_callback=None, sinks=None, keep_frames=True,
+                        stats_batch_size=16, num_workers=4, queue_size=16):
         if self.video_frames is None:
             raise ValueError("Load a video first.")
-
-        self.mask_areas = []
+        if self.inference_session is None:
+            raise ValueError("No model session, load the video with load_video to run the model again.")
+
+        sinks = sinks or []
+        render_overlay = keep_frames or show_live or any(sink.needs_frames for sink in sinks)
+        keep_masks = render_overlay or any(sink.needs_masks for sink in sinks)
+
+        # Frames outside the session (keyframe gaps, gated frames) are filled in by the filler
+        start, end = self.frame_range
+        total_frames = len(self.session_frame_indices)
+        self.results = SegmentationResults(end - start)
+        self.object_results = ObjectResults(prompts=self.prompts)
+        filler = KeyframeFiller(self.keyframe_fill or "carry", start=start, gated=self.gated_frames)
         self.processed_frames = [] 
-        self.mask_data_storage = [] 
-        total_frames = len(self.video_frames)
         start_time = time.time()
+        self.profiler.begin_run("propagate")
+        # The skip counter refers to the current propagation
+        if self.motion_gate is not None:
+            self.motion_gate.model_calls_skipped = 0
+
+        # Masks stay on the model device; area and bbox are reduced there in batches and full
+        # masks are only copied to the host when an overlay has to be rendered
+        batcher = MaskStatsBatcher(batch_size=stats_batch_size, keep_masks=keep_masks, profiler=self.profiler)
+        stopped = False
+
+        # The model iterator runs in its own thread while post-processing and overlays run on the pool;
+        # results come back in frame order and at most queue_size frames are in flight
+        pool = ThreadPoolExecutor(num_workers) if num_workers > 0 else None
+        model_outputs = self.model.propagate_in_video_iterator(self.inference_session) if total_frames > 0 else iter(())
+        model_outputs = self.profiler.iterate("propagate.model_step", model_outputs)
+        outputs = ordered_pipeline(
+            model_outputs,
+            self._postprocess_frame,
+            pool=pool,
+            max_in_flight=queue_size,
+        )
 
         # Iterate through video 
-        for i, model_outputs in enumerate(self.model.propagate_in_video_iterator(self.inference_session), 1):
-            frame_idx = model_outputs.frame_idx
-            processed_outputs = self.processor.postprocess_outputs(self.inference_session, model_outputs)
-            
-            # Use resized frame for display and calculation
-            current_frame = self.video_frames[frame_idx].copy()
-            h, w = current_frame.shape[:2]
-
-            mask_area = 0
-            
-            # Default empty values for frames with no squirrel detected
-            x_min, y_min, x_max, y_max = "", "", "", ""
-
-            # Check if any mask was detected in this frame
-            if processed_outputs["masks"].numel() > 0:
-                # Extract binary mask
-                mask = processed_outputs["masks"][0].detach().cpu().numpy().astype("uint8")
+        try:
+            for i, (frame_idx, mask, objects) in enumerate(outputs, 1):
+                batcher.add(frame_idx, mask, objects)
+                if batcher.full():
+                    frame_results = filler.fill(batcher.flush())
+                    stopped = not self._collect_frame_results(frame_results, keep_frames, show_live, sinks, pool, batcher.objects)
+
+                # Calculate and send status text to UI (first Bridge)
+                elapsed = time.time() - start_time
+                avg_per_frame = elapsed / i
+                remaining_time = avg_per_frame * (total_frames - i)
+                status_text = (
+                    f"Frame {i}/{total_frames} processed. "
+                    f"Elapsed: {elapsed:.1f}s, Remaining: {remaining_time:.1f}s"
+                )
                 
-                # Calculate area of mask
-                mask_area = int(np.sum(mask > 0))
-
-                #Calculate BBox
-                y_coords, x_coords = np.where(mask > 0)
-                if len(x_coords) > 0:
-                    x_min, x_max = int(np.min(x_coords)), int(np.max(x_coords))
-                    y_min, y_max = int(np.min(y_coords)), int(np.max(y_coords))
-
-                # Create overlay
-                overlay = current_frame.copy()
-                overlay[mask > 0] = [0, 255, 0]
-                current_frame = cv.addWeighted(overlay, 0.5, current_frame, 0.5, 0)
-
-            # Store frame and the metadata for the CSV
-            self.mask_areas.append(mask_area)
-            self.processed_frames.append(current_frame)
-            self.mask_data_storage.append({
-                "idx": frame_idx, 
-                "w": w, 
-                "h": h, 
-                "x1": x_min, 
-                "y1": y_min, 
-                "x2": x_max, 
-                "y2": y_max
-            })
+                if status_callback:
+                    status_callback(status_text)
 
-            # Show live video if enabled
-            if show_live:
-                cv.imshow("Segmented Video", current_frame)
-                if cv.waitKey(1) & 0xFF == ord('q'):
+                if stopped:
                     break
 
-            # Calculate and send status text to UI (first Bridge)
-            elapsed = time.time() - start_time
-            avg_per_frame = elapsed / i
-            remaining_time = avg_per_frame * (total_frames - i)
-            status_text = (
-                f"Frame {i}/{total_frames} processed. "
-                f"Elapsed: {elapsed:.1f}s, Remaining: {remaining_time:.1f}s"
-            )
-            
-            if status_callback:
-                status_callback(status_text)
-
-        cv.destroyAllWindows()
+            if not stopped:
+                frame_results = filler.fill(batcher.flush()) + filler.finish(end)
+                self._collect_frame_results(frame_results, keep_frames, show_live, sinks, pool, batcher.objects)
+        finally:
+            outputs.close()
+            if pool is not None:
+                pool.shutdown()
+            with self.profiler.stage("propagate.sinks_close"):
+                for sink in sinks:
+                    sink.close()
+            self.profiler.end_run()
+            self.profiler.record("propagate", time.time() - start_time)
+
+        if show_live:
+            cv.destroyAllWindows()
         print("\nFinished processing all frames")
+        if self.motion_gate is not None:
+            print(f"Motion gate: {self.motion_gate.model_calls_skipped} model calls skipped.")
+        if self.profiler.enabled:
+            print(self.profiler.format_table())
         return self.processed_frames
+
+    # Function to post-process the model output of one frame (runs on the worker pool).
+    # Returns the frame index, the union of all object masks on the model device (None if nothing was
+    # detected) and the objects as (object_ids, prompt indices, masks) or None.
+    def _postprocess_frame(self, model_outputs):
+        # Grad mode is thread local, so the worker threads need their own inference mode
+        with torch.inference_mode(), self.profiler.stage("propagate.postprocess"):
+            processed_outputs = self.processor.postprocess_outputs(self.inference_session, model_outputs)
+            masks = processed_outputs["masks"]
+            mask = self._union_mask(masks)
+        frame_idx = int(self.session_frame_indices[model_outputs.frame_idx])
+        if mask is None:
+            return frame_idx, None, None
+        object_ids, prompts = self._object_prompts(processed_outputs, len(masks))
+        return frame_idx, mask, (object_ids, prompts, masks)
+
+    # Function to blend the mask into the resized frame (only inside the bbox of the mask)
+    def _render_overlay(self, frame_idx, mask, bbox=None):
+        # Use resized frame for display and calculation (read-only view into the frame store)
+        current_frame = self.video_frames[frame_idx]
+        if mask is None:
+            return current_frame
+        with self.profiler.stage("propagate.overlay"):
+            return self.overlay_renderer.render(current_frame, mask, bbox)
+
+    # Function to store area, bbox and overlay of a batch of reduced frames.
+    # results are (frame_idx, area, bbox, mask, flags) tuples including the filled-in frames.
+    # objects maps frame_idx to the (object_id, prompt, area, bbox) rows of the model frames; they are
+    # moved into object_results.
+    # Returns False if the live view was closed with 'q'.
+    def _collect_frame_results(self, results, keep_frames, show_live, sinks, pool=None, objects=None):
+        # Overlays of the batch are rendered concurrently, order is kept by map
+        frames = [None] * len(results)
+        if keep_frames or show_live or any(sink.needs_frames for sink in sinks):
+            # The bbox of interpolated frames does not belong to their (carried) mask
+            args = (
+                [result[0] for result in results],
+                [result[3] for result in results],
+                [result[2] if result[4] == 0 else None for result in results],
+            )
+            frames = list(pool.map(self._render_overlay, *args) if pool is not None else map(self._render_overlay, *args))
+
+        h, w = self.video_frames.shape[1:3]
+        for (frame_idx, mask_area, bbox, mask, flags), current_frame in zip(results, frames):
+            # Store frame and the metadata for the CSV (bbox is None for frames with no squirrel detected)
+            self.results.append(frame_idx, w, h, mask_area, bbox, flags=flags)
+            frame_objects = objects.pop(frame_idx, None) if objects is not None else None
+            for object_id, prompt, area, object_bbox in frame_objects or ():
+                self.object_results.append(frame_idx, object_id, prompt, area, object_bbox)
+            if flags & FLAG_GATED:
+                self.motion_gate.model_calls_skipped += 1
+            # Propagated masks also serve later single-frame requests (filled frames are only estimates)
+            if flags == 0 and (mask is not None or bbox is None):
+                self.mask_cache.put(frame_idx, self.prompt, mask)
+            if keep_frames:
+                self.processed_frames.append(current_frame)
+
+            # Hand the result to the streaming writers
+            if sinks:
+                result = FrameResult(frame_idx, current_frame, mask_area, bbox, w, h, mask, frame_objects, flags)
+                with self.profiler.stage("propagate.sinks"):
+                    for sink in sinks:
+                        sink.write(result)
+            self.profiler.add_frames()
+
+            # Show live video if enabled
+            if show_live:
+                cv.imshow("Segmented Video", current_frame)
+                if cv.waitKey(1) & 0xFF == ord('q'):
+                    return False
+        return True
     
-    # Function to generate graph image from mask area data and return base64 URL
-    def generate_graph_image(self, chart_data):
-        if not chart_data or len(chart_data) == 0:
+    # Function to generate graph image from mask area data and return base64 URL.
+    # The image is rendered at screen resolution (width_px x height_px) from a min/max decimated series.
+    def generate_graph_image(self, chart_data, width_px=1400, height_px=400):
+        if chart_data is None or len(chart_data) == 0:
             return None
+        x, y = minmax_decimate(chart_data, width_px)
+
+        # matplotlib is only imported when the first graph is drawn
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        import matplotlib.ticker as ticker
 
         # Create graph
-        fig, ax = plt.subplots(figsize=(14, 4), dpi=1000) 
+        fig, ax = plt.subplots(figsize=(14, 4), dpi=width_px / 14)
+        fig.set_figheight(height_px / fig.dpi)
         fig.patch.set_facecolor('#313244')
         ax.set_facecolor('#313244')
-        ax.plot(chart_data, color="#f38ba8", linewidth=3, antialiased=True)
-        ax.fill_between(range(len(chart_data)), chart_data, color="#f38ba8", alpha=0.15)
+        ax.plot(x, y, color="#f38ba8", linewidth=3, antialiased=True)
+        ax.fill_between(x, y, color="#f38ba8", alpha=0.15)
         ax.set_xlabel("Video Frame", color="#cdd6f4", fontsize=17, fontweight='bold', labelpad=12)
         ax.set_ylabel("Masked Pixels", color="#cdd6f4", fontsize=17, fontweight='bold', labelpad=12)
         ax.tick_params(axis='both', colors='#a6adc8', labelsize=15)
@@ -221,7 +565,7 @@ class Sam3VideoSegmenter:
 
         # Save graph to buffer and encode as base64 
         buf = io.BytesIO()
-        fig.savefig(buf, format="png", facecolor=fig.get_facecolor(), bbox_inches='tight')
+        fig.savefig(buf, format="png", facecolor=fig.get_facecolor())
         buf.seek(0)
         plt.close(fig)
         img_base64 = base64.b64encode(buf.read()).decode("utf-8")
@@ -229,17 +573,14 @@ class Sam3VideoSegmenter:
     
     # Function to export graph data to CSV
     def export_graph_csv(self, output_path):
-        if not hasattr(self, "mask_areas") or not self.mask_areas:
+        if len(self.results) == 0:
             print("No data to export.")
             return False
 
         # writing CSV file with frame index and mask pixel area
         try:
-            with open(output_path, mode='w', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow(["Frame", "Masked_Pixels"])
-                for idx, area in enumerate(self.mask_areas):
-                    writer.writerow([idx, area])
+            with self.profiler.stage("export.area_csv"):
+                self.results.write_area_csv(output_path)
             print(f"CSV exported successfully to {output_path}")
             return True
         except Exception as e:
@@ -248,51 +589,147 @@ class Sam3VideoSegmenter:
 
     # Function to export mask data (frame index, frame dimensions and bbox)to CSV
     def export_mask_csv(self, output_path):
-        if not hasattr(self, "mask_data_storage") or not self.mask_data_storage:
+        if len(self.results) == 0:
             print("Error: No data to export. Please run 'Propagate Video' first.")
             return False
 
         # writing CSV with frame index, frame dimensions, and bbox
         try:
-            with open(output_path, mode='w', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow(["frame_idx", "width", "height", "x_min", "y_min", "x_max", "y_max"])
-                for data in self.mask_data_storage:
-                    writer.writerow([
-                        data["idx"], 
-                        data["w"], 
-                        data["h"], 
-                        data["x1"], 
-                        data["y1"], 
-                        data["x2"], 
-                        data["y2"]
-                    ])
-            print(f"Successfully exported {len(self.mask_data_storage)} frames to {output_path}")
+            with self.profiler.stage("export.bbox_csv"):
+                self.results.write_bbox_csv(output_path)
+            print(f"Successfully exported {len(self.results)} frames to {output_path}")
             return True
         except Exception as e:
             print(f"CSV Export Error: {e}")
             return False
         
-    # Function to export processed video frames as MP4
-    def export_video(self, frames, output_path, fps=30): # Add 'frames' here
+    # Function to export area and bbox of every tracked object per frame to CSV
+    # (frame_idx, object_id, prompt, area, bbox; one row per object and frame)
+    def export_object_csv(self, output_path):
+        if len(self.results) == 0:
+            print("Error: No data to export. Please run 'Propagate Video' first.")
+            return False
+        try:
+            with self.profiler.stage("export.object_csv"):
+                self.object_results.write_csv(output_path)
+            print(f"Successfully exported {len(self.object_results)} object rows to {output_path}")
+            return True
+        except Exception as e:
+            print(f"CSV Export Error: {e}")
+            return False
+
+    # Function to export all per-frame results (and the per-object table) as a compact binary file (.npz)
+    def export_results(self, output_path):
+        if len(self.results) == 0:
+            print("Error: No data to export. Please run 'Propagate Video' first.")
+            return False
+        with self.profiler.stage("export.results"):
+            self.results.save(output_path, objects=self.object_results)
+        print(f"Results exported successfully to {output_path}")
+        return True
+
+    # Function to export processed video frames as MP4 (encoded on a background writer thread,
+    # see logic/video_export.py); fps defaults to the frame rate of the loaded video
+    def export_video(self, frames, output_path, fps=None, codec="h264", quality="medium"):
         if not frames:
             print("Error: No frames provided for export.")
             return False
 
-        # write video using cv2
         try:
-            h, w = frames[0].shape[:2]
-            
-            fourcc = cv.VideoWriter_fourcc(*'mp4v')
-            writer = cv.VideoWriter(output_path, fourcc, fps, (w, h))
+            with self.profiler.stage("export_video"):
+                writer = AsyncVideoWriter(
+                    output_path, fps=fps or self.video_fps, codec=codec, quality=quality, profiler=self.profiler
+                )
+                for frame in frames:
+                    writer.write(frame)
+                writer.close()
+            print(f"Video exported successfully to {output_path} ({writer.frames_written} frames, {writer.throughput:.1f} fps)")
+            return True
+        
+        except Exception as e:
+            print(f"Failed to export video: {e}")
+            return False
 
-            for frame in frames:
-                writer.write(cv.cvtColor(frame, cv.COLOR_RGB2BGR))
+    # Function to render the overlay of a frame for the video export from the original size frame:
+    # at original resolution, or fitted into max_side pixels (aspect ratio kept, never upscaled).
+    # renderer is an OverlayRenderer with another colour or alpha (default: self.overlay_renderer).
+    def render_export_frame(self, frame_idx, mask, max_side=None, renderer=None):
+        source = self.video_frames_original_size[frame_idx]
+        h, w = source.shape[:2]
+        out = None
+        if max_side and max(h, w) > max_side:
+            scale = max_side / max(h, w)
+            out = np.empty((max(int(round(h * scale)), 1), max(int(round(w * scale)), 1), 3), dtype=np.uint8)
+        return (renderer or self.overlay_renderer).render(source, mask, out=out)
+
+    # Function to get the metadata stored with a mask archive (see logic/sinks.py MaskArchiveSink)
+    def archive_metadata(self):
+        return {
+            "video_path": self.video_path,
+            "video_fps": self.video_fps,
+            "target_size": self.TARGET_SIZE,
+            "frame_range": list(self.frame_range) if self.frame_range else None,
+            "keyframe_fill": self.keyframe_fill,
+            "prompts": list(self.prompts),
+        }
+
+    # Function to reopen an analysed clip from its mask archive without running the model: restores
+    # results (mask_areas, mask_data_storage), object results and prompts, and loads the frames of the
+    # video for overlays. video_path defaults to the path stored in the archive.
+    def load_mask_archive(self, archive_path, video_path=None, use_cache=True):
+        archive = MaskArchive(archive_path)
+        try:
+            video_path = video_path or archive.metadata.get("video_path")
+            if not video_path or not os.path.exists(video_path):
+                raise FileNotFoundError(f"Video of the mask archive not found: {video_path}")
+            with self.profiler.stage("load_mask_archive"):
+                self.load_video(video_path, use_cache=use_cache, init_session=False)
+            if archive.shape is not None and tuple(archive.shape) != tuple(self.video_frames.shape[1:3]):
+                raise ValueError(
+                    f"The masks of the archive are {archive.shape[1]}x{archive.shape[0]}, the frames "
+                    f"{self.video_frames.shape[2]}x{self.video_frames.shape[1]}; use target_size "
+                    f"{archive.metadata.get('target_size')}."
+                )
+        except Exception:
+            archive.close()
+            raise
+
+        self.mask_archive = archive
+        self.results = archive.results if archive.results is not None else SegmentationResults()
+        self.object_results = archive.object_results if archive.object_results is not None else ObjectResults()
+        self.prompts = list(archive.prompts)
+        self.prompt = None
+        if archive.metadata.get("frame_range"):
+            self.frame_range = tuple(archive.metadata["frame_range"])
+        print(f"Restored {len(self.results)} frames from {archive_path}")
+
+    # Function to export the overlay video again from the masks of the mask archive (no model needed),
+    # e.g. at another size or with another overlay colour/alpha
+    def export_overlay_video(self, output_path, fps=None, codec="h264", quality="medium", max_side=None,
+                             color=None, alpha=None):
+        if self.mask_archive is None or len(self.results) == 0:
+            print("Error: No mask archive loaded.")
+            return False
+        renderer = self.overlay_renderer
+        if color is not None or alpha is not None:
+            renderer = OverlayRenderer(
+                color=self.overlay_renderer.color if color is None else color,
+                alpha=self.overlay_renderer.alpha if alpha is None else alpha,
+            )
 
-            writer.release()
-            print(f"Video exported successfully to {output_path}")
+        try:
+            with self.profiler.stage("export_video"):
+                writer = AsyncVideoWriter(
+                    output_path, fps=fps or self.video_fps, codec=codec, quality=quality, profiler=self.profiler
+                )
+                # Masks are decoded here while the writer thread renders and encodes the previous frames
+                for frame_idx in self.results["frame_idx"].tolist():
+                    mask = self.mask_archive.get(frame_idx) if frame_idx in self.mask_archive else None
+                    writer.write(partial(self.render_export_frame, frame_idx, mask, max_side, renderer))
+                writer.close()
+            print(f"Video exported successfully to {output_path} ({writer.frames_written} frames, {writer.throughput:.1f} fps)")
             return True
-        
+
         except Exception as e:
             print(f"Failed to export video: {e}")
             return False
@@ -0,0 +1,54 @@
+from collections import OrderedDict
+from logic.profiler import Profiler
+
+# Lazy replacement for the processed_frames dict of a SAM3 inference session.
+# Instead of preprocessing the whole clip up front, frames are run through the
+# video processor in small chunks the first time the model asks for them and
+# only the most recent chunks are kept. With indices the session only sees those frames
+# (session frame i is frames[indices[i]]).
+class SessionFrames:
+    def __init__(self, frames, video_processor, device, dtype, chunk_size=8, max_cached=32, indices=None,
+                 profiler=None):
+        self.frames = frames
+        self.profiler = profiler or Profiler(enabled=False)
+        self.indices = indices if indices is not None else range(len(frames))
+        self.video_processor = video_processor
+        self.device = device
+        self.dtype = dtype
+        self.chunk_size = chunk_size
+        self.max_cached = max_cached
+        self._cache = OrderedDict()
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __contains__(self, frame_idx):
+        return 0 <= frame_idx < len(self.indices)
+
+    def __getitem__(self, frame_idx):
+        if frame_idx not in self:
+            raise KeyError(frame_idx)
+        if frame_idx not in self._cache:
+            self._load_chunk(frame_idx)
+        self._cache.move_to_end(frame_idx)
+        return self._cache[frame_idx]
+
+    # Frames added by streaming inference are kept like cached ones
+    def __setitem__(self, frame_idx, pixel_values):
+        self._cache[frame_idx] = pixel_values
+        self._evict()
+
+    # Function to preprocess the chunk of frames starting at frame_idx
+    def _load_chunk(self, frame_idx):
+        end = min(frame_idx + self.chunk_size, len(self.indices))
+        chunk = [self.frames[self.indices[i]] for i in range(frame_idx, end)]
+        with self.profiler.stage("preprocess"):
+            processed = self.video_processor(videos=chunk, device=self.device, return_tensors="pt")
+            pixel_values = processed.pixel_values_videos[0].to(self.device, dtype=self.dtype)
+        for offset, values in enumerate(pixel_values):
+            self._cache[frame_idx + offset] = values
+        self._evict()
+
+    def _evict(self):
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
@@ -0,0 +1,143 @@
+import csv
+from collections import namedtuple
+from functools import partial
+from logic.video_export import AsyncVideoWriter
+from logic.mask_archive import MaskArchiveWriter
+from logic.results import SegmentationResults, ObjectResults
+
+# Result of one propagated frame as handed to the sinks.
+# frame is the overlaid RGB frame (None if no sink needs frames), bbox is (x_min, y_min, x_max, y_max) or None,
+# mask is the low-res mask (None if no sink needs masks or nothing was detected), the union of all objects.
+# objects are the (object_id, prompt, area, bbox) rows of the tracked objects (None for frames filled in
+# without the model), flags the FLAG_INTERPOLATED/FLAG_GATED bits of logic/results.py.
+FrameResult = namedtuple(
+    "FrameResult", ["frame_idx", "frame", "area", "bbox", "width", "height", "mask", "objects", "flags"],
+    defaults=(None, None, 0),
+)
+
+
+# Base class for writers that receive every frame result while propagate_video runs
+class FrameSink:
+    # Whether the sink needs the overlaid frame or only the metadata
+    needs_frames = False
+    # Whether the sink needs the low-res masks (e.g. to render its own overlays)
+    needs_masks = False
+
+    def write(self, result):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+# Sink writing the overlaid frames to a video file on a background writer thread (logic/video_export.py).
+# Without render the preview frames of the propagation are written. With render(frame_idx, mask) the
+# frames are rendered by the writer thread instead, e.g. at original size with
+# Sam3VideoSegmenter.render_export_frame.
+class VideoSink(FrameSink):
+    def __init__(self, output_path, fps=30, codec="h264", quality="medium", render=None, queue_size=32, profiler=None):
+        self.output_path = output_path
+        self.render = render
+        self.needs_frames = render is None
+        self.needs_masks = render is not None
+        self.writer = AsyncVideoWriter(
+            output_path, fps=fps, codec=codec, quality=quality, queue_size=queue_size, profiler=profiler
+        )
+        self.closed = False
+
+    def write(self, result):
+        if self.render is not None:
+            self.writer.write(partial(self.render, result.frame_idx, result.mask))
+        else:
+            self.writer.write(result.frame)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.writer.close()
+            print(
+                f"Video exported successfully to {self.output_path} "
+                f"({self.writer.frames_written} frames, {self.writer.throughput:.1f} fps)"
+            )
+
+
+# Sink writing the mask area per frame, same format as export_graph_csv
+class AreaCsvSink(FrameSink):
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.file = open(output_path, mode="w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(["Frame", "Masked_Pixels"])
+
+    def write(self, result):
+        self.writer.writerow([result.frame_idx, result.area])
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+            print(f"CSV exported successfully to {self.output_path}")
+
+
+# Sink writing frame size and bbox per frame, same format as export_mask_csv
+class BBoxCsvSink(FrameSink):
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.file = open(output_path, mode="w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(["frame_idx", "width", "height", "x_min", "y_min", "x_max", "y_max"])
+
+    def write(self, result):
+        bbox = result.bbox if result.bbox is not None else ("", "", "", "")
+        self.writer.writerow([result.frame_idx, result.width, result.height, *bbox])
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+            print(f"Successfully exported bboxes to {self.output_path}")
+
+
+# Sink writing area and bbox of every tracked object per frame, same format as export_object_csv.
+# prompts is the list of text prompts (to write the prompt text instead of its index).
+class ObjectCsvSink(FrameSink):
+    def __init__(self, output_path, prompts=()):
+        self.output_path = output_path
+        self.prompts = list(prompts)
+        self.file = open(output_path, mode="w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(["frame_idx", "object_id", "prompt", "area", "x_min", "y_min", "x_max", "y_max"])
+
+    def write(self, result):
+        for object_id, prompt, area, bbox in result.objects or ():
+            text = self.prompts[prompt] if 0 <= prompt < len(self.prompts) else ""
+            self.writer.writerow([result.frame_idx, object_id, text, area, *bbox])
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+            print(f"Successfully exported objects to {self.output_path}")
+
+
+# Sink writing the masks with the per-frame and per-object results to a mask archive (logic/mask_archive.py),
+# which Sam3VideoSegmenter.load_mask_archive reopens without the model.
+# metadata is stored with the archive, e.g. Sam3VideoSegmenter.archive_metadata().
+class MaskArchiveSink(FrameSink):
+    needs_masks = True
+
+    def __init__(self, output_path, metadata=None, chunk_size=64):
+        self.output_path = output_path
+        self.metadata = dict(metadata or {})
+        self.archive = MaskArchiveWriter(output_path, chunk_size=chunk_size)
+        self.results = SegmentationResults()
+        self.objects = ObjectResults(prompts=self.metadata.get("prompts", ()))
+
+    def write(self, result):
+        self.archive.add(result.frame_idx, result.mask)
+        self.results.append(result.frame_idx, result.width, result.height, result.area, result.bbox, flags=result.flags)
+        for object_id, prompt, area, bbox in result.objects or ():
+            self.objects.append(result.frame_idx, object_id, prompt, area, bbox)
+
+    def close(self):
+        if not self.archive.file.closed:
+            self.archive.close(self.results, self.objects, self.metadata)
+            print(f"Mask archive written to {self.output_path} ({len(self.results)} frames, "
+                  f"{self.archive.nbytes / 1024:.0f} KB of masks)")
@@ -0,0 +1,119 @@
+import time
+import types
+import numpy as np
+import torch
+from logic.synthetic_video import SQUIRREL_COLOR
+
+# Deterministic stand-in for Sam3VideoModel / Sam3VideoProcessor, so the pipeline can be run,
+# profiled and benchmarked without the gated weights or a GPU. The stub segments pixels close to
+# the squirrel colour of the synthetic clips (logic/synthetic_video.py) at low resolution and the
+# processor upsamples the logits to the frame size like the real post-processing does.
+# Use it with Sam3VideoSegmenter(model_id=STUB_MODEL_ID) or pass create_stub() as model/processor.
+# Only prompts containing "squirrel" find an object (one per prompt); other prompts stay empty.
+
+STUB_MODEL_ID = "stub"
+
+
+# Inference session with the attributes the segmenter and SessionFrames use
+class StubSession:
+    def __init__(self):
+        self.processed_frames = None
+        self.video_height = None
+        self.video_width = None
+        self.prompts = []
+        self.hotstart_removed_obj_ids = set()
+
+    @property
+    def num_frames(self):
+        return len(self.processed_frames)
+
+
+# Video processor: frames become float tensors (N, 3, H, W) without resizing
+class StubVideoProcessor:
+    def __call__(self, videos, device=None, return_tensors=None):
+        frames = torch.from_numpy(np.stack(videos))
+        return types.SimpleNamespace(pixel_values_videos=[frames.permute(0, 3, 1, 2).float()])
+
+
+# postprocess_ms adds a fixed delay to every post-processing call
+class StubProcessor:
+    def __init__(self, postprocess_ms=0.0):
+        self.video_processor = StubVideoProcessor()
+        self.postprocess_ms = postprocess_ms
+
+    def init_video_session(self, inference_device=None, dtype=None, **kwargs):
+        return StubSession()
+
+    def add_text_prompt(self, inference_session, text):
+        inference_session.prompts = [text] if isinstance(text, str) else list(text)
+
+    # Function to upsample the low-res logits to the frame size; returns masks (N, H, W), object ids
+    # and the object ids found by each prompt
+    def postprocess_outputs(self, inference_session, model_outputs, original_sizes=None):
+        h, w = inference_session.video_height, inference_session.video_width
+        if self.postprocess_ms:
+            time.sleep(self.postprocess_ms / 1000)
+        logits = model_outputs.low_res_masks
+        object_ids = model_outputs.object_ids
+        prompt_to_obj_ids = {}
+        for prompt, object_id in zip(model_outputs.object_prompts, object_ids.tolist()):
+            prompt_to_obj_ids.setdefault(prompt, []).append(object_id)
+        if logits.shape[0] == 0:
+            masks = torch.zeros((0, h, w), dtype=torch.bool)
+        else:
+            masks = torch.nn.functional.interpolate(logits[:, None], size=(h, w), mode="bilinear", align_corners=False)[:, 0] > 0
+        return {"masks": masks, "object_ids": object_ids, "prompt_to_obj_ids": prompt_to_obj_ids}
+
+
+class StubModel:
+    # model_ms adds a fixed delay per model step to emulate the cost of the real model; cpu_matmuls
+    # burns CPU with matrix multiplications instead, so the step time depends on the cores like real
+    # CPU inference does
+    def __init__(self, model_ms=0.0, low_res_size=72, color_tolerance=40.0, cpu_matmuls=0):
+        self.model_ms = model_ms
+        self.cpu_matmuls = cpu_matmuls
+        self.weights = torch.randn(256, 256, generator=torch.Generator().manual_seed(0)) if cpu_matmuls else None
+        self.low_res_size = low_res_size
+        self.color = torch.tensor(SQUIRREL_COLOR, dtype=torch.float32).view(3, 1, 1)
+        self.color_tolerance = color_tolerance
+
+    # Function to segment one session frame; outputs carry frame_idx, low_res_masks (N, h, w), the
+    # object ids (the index of the prompt + 1) and the prompt of every object
+    def __call__(self, inference_session, frame_idx, **kwargs):
+        pixels = inference_session.processed_frames[frame_idx].float()
+        if self.model_ms:
+            time.sleep(self.model_ms / 1000)
+        if self.cpu_matmuls:
+            x = self.weights
+            for _ in range(self.cpu_matmuls):
+                x = torch.tanh(x @ self.weights)
+        prompts = [(i, prompt) for i, prompt in enumerate(inference_session.prompts) if "squirrel" in prompt.lower()]
+        empty = types.SimpleNamespace(
+            frame_idx=frame_idx, low_res_masks=torch.zeros((0, 1, 1)),
+            object_ids=torch.zeros(0, dtype=torch.int64), object_prompts=[],
+        )
+        if not prompts:
+            return empty
+
+        # Share of squirrel-coloured pixels per low-res cell, as logits around 0
+        distance = (pixels - self.color).abs().amax(dim=0)
+        hits = (distance < self.color_tolerance).float()
+        size = (self.low_res_size, self.low_res_size)
+        coverage = torch.nn.functional.interpolate(hits[None, None], size=size, mode="area")[0]
+        if coverage.max() < 0.5:
+            return empty
+        return types.SimpleNamespace(
+            frame_idx=frame_idx,
+            low_res_masks=(coverage - 0.5).expand(len(prompts), -1, -1),
+            object_ids=torch.tensor([i + 1 for i, _ in prompts]),
+            object_prompts=[prompt for _, prompt in prompts],
+        )
+
+    def propagate_in_video_iterator(self, inference_session, **kwargs):
+        for frame_idx in range(inference_session.num_frames):
+            yield self(inference_session=inference_session, frame_idx=frame_idx)
+
+
+# Function to create a stub model and processor pair
+def create_stub(model_ms=0.0, postprocess_ms=0.0, cpu_matmuls=0):
+    return StubModel(model_ms=model_ms, cpu_matmuls=cpu_matmuls), StubProcessor(postprocess_ms=postprocess_ms)
@@ -0,0 +1,65 @@
+import math
+import cv2 as cv
+import numpy as np
+
+# Synthetic trail camera clips for benchmarks and offline runs: a static textured background
+# with sensor noise and a brown "squirrel" that enters, runs along a curved path and leaves again.
+# Clips are deterministic for a given seed. The stub model (logic/stub_model.py) finds the
+# squirrel by its colour, so its masks follow the animal like the real model's would.
+
+SQUIRREL_COLOR = (150, 90, 40)  # RGB
+RESOLUTIONS = {
+    "360p": (640, 360),
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+}
+
+
+# Function to get the squirrel at frame i as (cx, cy, rx, ry) in pixels, None while it is out of view.
+# It is visible from 10% to 85% of the clip.
+def squirrel_position(i, num_frames, width, height):
+    t = i / max(num_frames - 1, 1)
+    if t < 0.1 or t > 0.85:
+        return None
+    u = (t - 0.1) / 0.75
+    cx = width * (0.1 + 0.8 * u)
+    cy = height * (0.6 + 0.15 * math.sin(u * 4 * math.pi))
+    size = min(width, height) * (0.06 + 0.02 * math.sin(u * 9 * math.pi))
+    return cx, cy, size * 1.6, size
+
+
+# Function to draw the static background (grass and sky colours, far from the squirrel colour)
+def _background(width, height, rng):
+    noise = rng.integers(0, 25, (height // 8 + 1, width // 8 + 1, 1), dtype=np.uint8)
+    texture = cv.resize(noise, (width, height), interpolation=cv.INTER_CUBIC)[..., None]
+    base = np.empty((height, width, 3), dtype=np.uint8)
+    base[:] = (50, 115, 55)
+    base[: height // 3] = (110, 130, 150)
+    return cv.add(base, np.repeat(texture, 3, axis=2))
+
+
+# Function to write a synthetic clip (mp4v); noise is the amplitude of the per-frame sensor noise
+def write_synthetic_video(path, num_frames=300, width=1280, height=720, fps=30, seed=0, noise=2):
+    rng = np.random.default_rng(seed)
+    background = _background(width, height, rng)
+    writer = cv.VideoWriter(path, cv.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise IOError(f"Could not open video writer for {path}")
+    try:
+        for i in range(num_frames):
+            frame = background.copy()
+            if noise:
+                frame = cv.add(frame, rng.integers(0, noise + 1, frame.shape, dtype=np.uint8))
+            position = squirrel_position(i, num_frames, width, height)
+            if position is not None:
+                cx, cy, rx, ry = position
+                center = (int(cx), int(cy))
+                cv.ellipse(frame, center, (int(rx), int(ry)), 0, 0, 360, SQUIRREL_COLOR, -1)
+                # Tail
+                tail = (int(cx - rx * 1.1), int(cy - ry * 0.8))
+                cv.ellipse(frame, tail, (int(rx * 0.5), int(ry * 0.9)), 30, 0, 360, SQUIRREL_COLOR, -1)
+            writer.write(cv.cvtColor(frame, cv.COLOR_RGB2BGR))
+    finally:
+        writer.release()
+    return path
@@ -0,0 +1,172 @@
+import queue
+import threading
+import time
+from fractions import Fraction
+import cv2 as cv
+from logic.profiler import Profiler
+
+# Video export on a background writer thread.
+# Frames are handed over through a bounded queue (a slow encoder applies backpressure instead of
+# piling up frames) and encoded with PyAV, which converts RGB to the codec's pixel format and
+# encodes with FFmpeg's own threads. Without PyAV the export falls back to cv.VideoWriter (mp4v).
+
+# Codec name -> (FFmpeg encoder, pixel format, OpenCV fourcc for the fallback)
+CODECS = {
+    "h264": ("libx264", "yuv420p", "avc1"),
+    "h265": ("libx265", "yuv420p", "hev1"),
+    "vp9": ("libvpx-vp9", "yuv420p", "vp09"),
+    "mpeg4": ("mpeg4", "yuv420p", "mp4v"),
+}
+QUALITIES = ("low", "medium", "high")
+
+# Encoder options per quality: constant rate factor for x264/x265/vp9, bits per pixel for mpeg4
+_CRF = {
+    "libx264": {"low": 28, "medium": 23, "high": 18},
+    "libx265": {"low": 32, "medium": 28, "high": 22},
+    "libvpx-vp9": {"low": 40, "medium": 33, "high": 24},
+}
+_MPEG4_BITS_PER_PIXEL = {"low": 0.05, "medium": 0.1, "high": 0.2}
+
+_STOP = object()
+
+
+# Function to check whether PyAV is installed
+def pyav_available():
+    try:
+        import av  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# Encoder writing RGB frames with PyAV
+class _PyAVEncoder:
+    def __init__(self, output_path, fps, width, height, codec, quality):
+        import av
+
+        encoder, pix_fmt, _ = CODECS[codec]
+        try:
+            av.codec.Codec(encoder, "w")
+        except ValueError:
+            print(f"Encoder {encoder} is not available in this FFmpeg build, using mpeg4.")
+            encoder, pix_fmt, _ = CODECS["mpeg4"]
+
+        self.container = av.open(output_path, mode="w")
+        self.stream = self.container.add_stream(encoder, rate=Fraction(fps).limit_denominator(1001))
+        # 4:2:0 chroma subsampling needs even frame sizes
+        self.stream.width = width - width % 2
+        self.stream.height = height - height % 2
+        self.stream.pix_fmt = pix_fmt
+        self.stream.codec_context.thread_type = "AUTO"
+        if encoder in _CRF:
+            self.stream.options = {"crf": str(_CRF[encoder][quality])}
+            if encoder == "libvpx-vp9":
+                self.stream.options["b"] = "0"
+        else:
+            self.stream.bit_rate = int(width * height * fps * _MPEG4_BITS_PER_PIXEL[quality])
+        self._frame_type = av.VideoFrame
+
+    def write(self, frame):
+        video_frame = self._frame_type.from_ndarray(frame, format="rgb24")
+        video_frame = video_frame.reformat(width=self.stream.width, height=self.stream.height, format=self.stream.pix_fmt)
+        for packet in self.stream.encode(video_frame):
+            self.container.mux(packet)
+
+    def close(self):
+        for packet in self.stream.encode():
+            self.container.mux(packet)
+        self.container.close()
+
+
+# Encoder writing RGB frames with cv.VideoWriter (fallback without PyAV, quality is not adjustable)
+class _OpenCVEncoder:
+    def __init__(self, output_path, fps, width, height, codec, quality):
+        self.writer = cv.VideoWriter(output_path, cv.VideoWriter_fourcc(*CODECS[codec][2]), fps, (width, height))
+        if not self.writer.isOpened() and codec != "mpeg4":
+            print(f"OpenCV cannot write {codec}, using mp4v.")
+            self.writer = cv.VideoWriter(output_path, cv.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+        if not self.writer.isOpened():
+            raise IOError(f"Could not open video writer for {output_path}")
+
+    def write(self, frame):
+        self.writer.write(cv.cvtColor(frame, cv.COLOR_RGB2BGR))
+
+    def close(self):
+        self.writer.release()
+
+
+# Class to write RGB frames to a video file on a background thread.
+# write() takes a frame or a function returning the frame, which is then called on the writer
+# thread (e.g. to render overlays at original size off the propagation thread). The size of the
+# video is taken from the first frame. Errors of the writer thread are raised by write()/close().
+class AsyncVideoWriter:
+    def __init__(self, output_path, fps=30.0, codec="h264", quality="medium", queue_size=32, backend="auto",
+                 profiler=None):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec {codec!r}, expected one of {tuple(CODECS)}.")
+        if quality not in QUALITIES:
+            raise ValueError(f"Unknown quality {quality!r}, expected one of {QUALITIES}.")
+        if backend == "auto":
+            backend = "pyav" if pyav_available() else "opencv"
+        self.output_path = output_path
+        self.fps = fps
+        self.codec = codec
+        self.quality = quality
+        self.backend = backend
+        self.profiler = profiler or Profiler(enabled=False)
+        self.frames_written = 0
+        self.error = None
+        self.start_time = time.perf_counter()
+        self.end_time = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # Frames encoded per second since the writer was started
+    @property
+    def throughput(self):
+        elapsed = (self.end_time or time.perf_counter()) - self.start_time
+        return self.frames_written / elapsed if elapsed > 0 else 0.0
+
+    # Function to queue a frame; blocks while the queue is full
+    def write(self, frame):
+        if self.error is not None:
+            raise self.error
+        self._queue.put(frame)
+
+    # Function to wait until all queued frames are written and close the file
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def _run(self):
+        encoder_type = _PyAVEncoder if self.backend == "pyav" else _OpenCVEncoder
+        encoder = None
+        while True:
+            frame = self._queue.get()
+            if frame is _STOP:
+                break
+            # After an error the queue is still drained, so write() never blocks forever
+            if self.error is not None:
+                continue
+            try:
+                if callable(frame):
+                    with self.profiler.stage("export.render"):
+                        frame = frame()
+                if encoder is None:
+                    h, w = frame.shape[:2]
+                    encoder = encoder_type(self.output_path, self.fps, w, h, self.codec, self.quality)
+                with self.profiler.stage("export.encode"):
+                    encoder.write(frame)
+                self.frames_written += 1
+            except Exception as e:
+                self.error = e
+        try:
+            if encoder is not None:
+                encoder.close()
+        except Exception as e:
+            self.error = self.error or e
+        self.end_time = time.perf_counter()
@@ -0,0 +1,52 @@
+import cv2 as cv
+import numpy as np
+
+# Function to read basic video properties without decoding any frames
+def probe_video(video_path):
+    cap = cv.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video: {video_path}")
+
+    fps = cap.get(cv.CAP_PROP_FPS)
+    info = {
+        "frame_count": int(cap.get(cv.CAP_PROP_FRAME_COUNT)),
+        "fps": fps if fps and fps > 0 else 30.0,
+        "width": int(cap.get(cv.CAP_PROP_FRAME_WIDTH)),
+        "height": int(cap.get(cv.CAP_PROP_FRAME_HEIGHT)),
+    }
+    cap.release()
+    return info
+
+# Generator that decodes the video once and yields RGB frames in chunks of (n, H, W, 3).
+# The chunk buffer is reused, so consumers have to copy or write out a chunk before asking for the next one.
+def iter_video_chunks(video_path, chunk_size=64, start=0, stop=None):
+    cap = cv.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video: {video_path}")
+    if start > 0:
+        cap.set(cv.CAP_PROP_POS_FRAMES, start)
+
+    buffer = None
+    n = 0
+    frame_idx = start
+    try:
+        while stop is None or frame_idx < stop:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            if buffer is None:
+                buffer = np.empty((chunk_size, *frame.shape), dtype=np.uint8)
+
+            # Same channel order as transformers.video_utils.load_video
+            cv.cvtColor(frame, cv.COLOR_BGR2RGB, dst=buffer[n])
+            n += 1
+            frame_idx += 1
+
+            if n == chunk_size:
+                yield buffer[:n]
+                n = 0
+
+        if n > 0:
+            yield buffer[:n]
+    finally:
+        cap.release()
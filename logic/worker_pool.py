@@ -0,0 +1,203 @@
+import functools
+import math
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from logic.frame_store import FrameCache, default_spill_dir, load_frames, remove_spill_dir
+from logic.results import SegmentationResults, bbox_iou
+
+# Multi-process scheduler for CPU inference boxes: N worker processes each hold their own
+# Sam3VideoSegmenter (model replica) and take jobs from a shared queue. Jobs are plain
+# picklable functions job_fn(segmenter, *args); results come back in submission order.
+
+
+# Function run in every worker process
+def _worker_main(factory, num_threads, task_queue, result_queue):
+    import torch
+
+    torch.set_num_threads(num_threads)
+    segmenter = factory()
+    result_queue.put((None, "ready", os.getpid()))
+
+    for task_id, job_fn, args in iter(task_queue.get, None):
+        try:
+            result_queue.put((task_id, "ok", job_fn(segmenter, *args)))
+        except Exception as e:
+            result_queue.put((task_id, "error", f"{type(e).__name__}: {e}"))
+        finally:
+            segmenter.release_video()
+
+
+# Class to run jobs on a pool of segmenter processes
+class SegmenterPool:
+    # factory creates the segmenter inside each worker (must be picklable, e.g. a functools.partial);
+    # by default it builds a Sam3VideoSegmenter with segmenter_kwargs. The CPU cores are split
+    # evenly between workers unless threads_per_worker is given.
+    def __init__(self, num_workers, factory=None, threads_per_worker=None, **segmenter_kwargs):
+        if factory is None:
+            from logic.sam3_segmenter import Sam3VideoSegmenter
+            factory = functools.partial(Sam3VideoSegmenter, **segmenter_kwargs)
+        self.num_workers = num_workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // num_workers)
+
+        # spawn: every worker starts a fresh interpreter instead of forking a process with torch threads
+        ctx = mp.get_context("spawn")
+        self.task_queue = ctx.Queue()
+        self.result_queue = ctx.Queue()
+        self.workers = [
+            ctx.Process(
+                target=_worker_main,
+                args=(factory, self.threads_per_worker, self.task_queue, self.result_queue),
+                daemon=True,
+            )
+            for _ in range(num_workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+        # Wait until every worker has loaded its model
+        for _ in range(num_workers):
+            self._get_result()
+        self._next_task_id = 0
+
+    def _get_result(self):
+        while True:
+            try:
+                return self.result_queue.get(timeout=1.0)
+            except Exception:
+                if not all(worker.is_alive() for worker in self.workers):
+                    raise RuntimeError("A segmenter worker process died.")
+
+    # Generator running job_fn(segmenter, *args) for every args tuple in tasks; yields results in task order.
+    # A failed job raises a RuntimeError once it is its turn (or yields it with return_exceptions).
+    def map(self, job_fn, tasks, return_exceptions=False):
+        task_ids = []
+        for args in tasks:
+            task_id = self._next_task_id
+            self._next_task_id += 1
+            self.task_queue.put((task_id, job_fn, tuple(args)))
+            task_ids.append(task_id)
+
+        finished = {}
+        for task_id in task_ids:
+            while task_id not in finished:
+                done_id, status, value = self._get_result()
+                finished[done_id] = (status, value)
+            status, value = finished.pop(task_id)
+            if status == "error":
+                error = RuntimeError(f"Job {task_id} failed: {value}")
+                if not return_exceptions:
+                    raise error
+                value = error
+            yield value
+
+    def close(self):
+        for _ in self.workers:
+            self.task_queue.put(None)
+        for worker in self.workers:
+            worker.join(timeout=10)
+            if worker.is_alive():
+                worker.terminate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Job: propagate the frames [start, end) of a video (the whole video if end is None)
+# and return the result columns and the propagation time.
+# With cache_dir the frames are taken from that frame cache (e.g. a scratch cache of one run) instead of
+# the persistent one, and the video is released afterwards so the directory can be removed.
+def propagate_range(segmenter, video_path, prompt, start=0, end=None, cache_dir=None):
+    frame_cache = segmenter.frame_cache
+    if cache_dir is not None:
+        segmenter.frame_cache = FrameCache(cache_dir)
+    try:
+        segmenter.load_video(video_path)
+    finally:
+        segmenter.frame_cache = frame_cache
+    segmenter.add_text_prompt(prompt)
+    if start > 0 or end is not None:
+        segmenter.set_frame_range(start, end if end is not None else len(segmenter.video_frames))
+    start_time = time.perf_counter()
+    segmenter.propagate_video(keep_frames=False, num_workers=0)
+    seconds = time.perf_counter() - start_time
+    columns = segmenter.results.to_columns()
+    if cache_dir is not None:
+        segmenter.release_video()
+    return columns, seconds
+
+
+# Function to split num_frames into num_segments contiguous (start, end) ranges
+def split_frames(num_frames, num_segments):
+    num_segments = max(1, min(num_segments, num_frames))
+    bounds = [round(i * num_frames / num_segments) for i in range(num_segments + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+# Function to merge the results of overlapping windows into one continuous store.
+# In every overlap the handover to the next window happens at the frame where both windows agree
+# best (highest bbox IoU, latest frame on ties, so the next window had the most frames to lock on);
+# before it the previous window is used, after it the next one. Returns (results, seams) with one
+# (handover_frame, iou) entry per window boundary.
+def stitch_windows(parts):
+    merged = [parts[0]]
+    seams = []
+    for part in parts[1:]:
+        previous = merged[-1]
+        prev_idx, next_idx = previous["frame_idx"], part["frame_idx"]
+        overlap = np.intersect1d(prev_idx, next_idx)
+        if len(overlap) == 0:
+            merged.append(part)
+            continue
+
+        prev_rows = np.searchsorted(prev_idx, overlap)
+        next_rows = np.searchsorted(next_idx, overlap)
+        iou = bbox_iou(previous.select(prev_rows), part.select(next_rows))
+        handover = len(iou) - 1 - int(np.argmax(iou[::-1]))
+        seams.append((int(overlap[handover]), float(iou[handover])))
+
+        # Previous window up to and including the handover frame, next window after it
+        merged[-1] = previous.select(prev_idx <= overlap[handover])
+        merged.append(part.select(next_idx > overlap[handover]))
+    return SegmentationResults.concat(merged), seams
+
+
+# Function to propagate one long video as temporal windows on the pool and merge the results in order.
+# Every window gets its own session, which also caps the session state per worker; max_window limits
+# the window length in frames. With overlap > 0 every window starts that many frames early and the
+# overlaps are reconciled by stitch_windows, so the area curve has no jumps at the window borders.
+# The frames are decoded into a frame cache first, so workers only map them. With use_cache=False that is
+# a scratch cache in the spill directory, which is removed after the run instead of the persistent cache.
+def segment_video_parallel(pool, video_path, prompt, target_size, num_segments=None, overlap=0, max_window=None,
+                           use_cache=True):
+    cache_dir = None
+    if not use_cache:
+        os.makedirs(default_spill_dir(), exist_ok=True)
+        cache_dir = tempfile.mkdtemp(prefix="squirrel_windows_", dir=default_spill_dir())
+    try:
+        original, resized, spill_dir = load_frames(video_path, target_size, frame_cache=FrameCache(cache_dir))
+        num_frames = len(resized)
+        original.close()
+        resized.close()
+        remove_spill_dir(spill_dir)
+
+        num_segments = num_segments or pool.num_workers
+        if max_window:
+            num_segments = max(num_segments, math.ceil(num_frames / max(1, max_window - overlap)))
+        segments = split_frames(num_frames, num_segments)
+        tasks = [(video_path, prompt, max(0, start - overlap), end, cache_dir) for start, end in segments]
+        parts = [SegmentationResults.from_columns(columns) for columns, _ in pool.map(propagate_range, tasks)]
+    finally:
+        remove_spill_dir(cache_dir)
+
+    results, seams = stitch_windows(parts)
+    for frame_idx, iou in seams:
+        print(f"Window handover at frame {frame_idx} (bbox IoU {iou:.2f})")
+    return results
@@ -1,6 +1,5 @@
 import sys
 import os
-import time
 from pathlib import Path
 
 from PySide6.QtWidgets import QApplication
@@ -26,16 +25,15 @@ if __name__ == "__main__":
     # laoding screen setup
     splash = SplashScreen(logo_img, width=500, height=350)
     splash.show()
-    
-    for _ in range(10):
-        app.processEvents()
+    app.processEvents()
         
     # setup frame provider and bridge for interacting with qml
+    # (login and model loading run in the background once the window is up, see Bridge.start_model_loading)
     provider = FrameProvider()
-    bridge = Bridge(provider, app, splash=splash)
+    bridge = Bridge(provider, app)
     
     # Load QML and show main window
-    if splash: splash.set_progress(90)
+    splash.set_progress(60, "Loading interface...")
     engine = QQmlApplicationEngine()
     engine.addImageProvider("frames", provider)
     engine.rootContext().setContextProperty("python_bridge", bridge)
@@ -44,9 +42,7 @@ if __name__ == "__main__":
     if not engine.rootObjects():
         sys.exit(-1)
 
-    if splash: splash.set_progress(100)
-    
-    time.sleep(0.5)  
+    splash.set_progress(100)
     main_window = engine.rootObjects()[0]
     fade = QPropertyAnimation(splash, b"windowOpacity")
     fade.setDuration(600)
@@ -57,5 +53,6 @@ if __name__ == "__main__":
     main_window.raise_() 
     main_window.requestActivate()
     fade.start()
+    bridge.start_model_loading()
 
     sys.exit(app.exec())
\ No newline at end of file